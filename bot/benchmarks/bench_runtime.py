@@ -0,0 +1,132 @@
+"""Updates/s benchmark of the default vs fast (uvloop + orjson) runtime.
+
+Updates go through a real Dispatcher and a handler that answers with a vote
+card. The API session is fake: it serializes requests and parses canned
+responses with the session's JSON functions, but never touches the network.
+
+Usage:
+    uv sync --extra fast
+    uv run python benchmarks/bench_runtime.py --updates 20000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections.abc import AsyncGenerator
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from aiogram import Bot, Dispatcher, Router  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.methods import TelegramMethod  # noqa: E402
+from aiogram.methods.base import TelegramType  # noqa: E402
+from aiogram.types import Message  # noqa: E402
+
+from cards import render_vote_card  # noqa: E402
+from runtime import get_json_functions, install_event_loop_policy  # noqa: E402
+
+BATCH_SIZE = 100
+
+SEND_MESSAGE_RESPONSE = (
+    '{"ok":true,"result":{"message_id":1,"date":1700000000,'
+    '"chat":{"id":42,"type":"private","first_name":"bench"},'
+    '"from":{"id":1,"is_bot":true,"first_name":"bot"},"text":"ok"}}'
+)
+
+UPDATE_TEMPLATE = (
+    '{"update_id":%d,"message":{"message_id":%d,"date":1700000000,'
+    '"chat":{"id":%d,"type":"private","first_name":"bench"},'
+    '"from":{"id":%d,"is_bot":false,"first_name":"bench"},"text":"/vote"}}'
+)
+
+
+class FakeSession(BaseSession):
+    """Session that does the JSON work of a real one without HTTP."""
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[TelegramType], timeout: int | None = None
+    ) -> TelegramType:
+        # Yield to the loop like a real HTTP round trip would
+        await asyncio.sleep(0)
+        files: dict[str, Any] = {}
+        for value in method.model_dump(warnings=False).values():
+            self.prepare_value(value, bot=bot, files=files)
+        response = self.check_response(
+            bot=bot, method=method, status_code=200, content=SEND_MESSAGE_RESPONSE
+        )
+        return response.result  # type: ignore[return-value]
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: dict[str, Any] | None = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        raise NotImplementedError
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+async def answer_card(message: Message) -> None:
+    """Answer like /vote does, with a caption and an inline keyboard."""
+    card = render_vote_card(
+        {"id": message.message_id, "name": "Шаурма", "description": "Острая", "price": 299.0}
+    )
+    await message.answer(card.caption, reply_markup=card.reply_markup)
+
+
+async def run(updates: int, fast: bool) -> float:
+    """Feed updates through the dispatcher.
+
+    Returns:
+        Updates per second
+    """
+    if fast:
+        json_loads, json_dumps = get_json_functions()
+        session = FakeSession(json_loads=json_loads, json_dumps=json_dumps)
+    else:
+        session = FakeSession()
+
+    bot = Bot(token="1:bench", session=session)
+    router = Router()
+    router.message.register(answer_card)
+    dp = Dispatcher()
+    dp.include_router(router)
+    raw_updates = [UPDATE_TEMPLATE % (i, i, 42 + i % 100, 42 + i % 100) for i in range(updates)]
+
+    # Updates are handled concurrently in batches, as polling does
+    started = time.perf_counter()
+    for i in range(0, updates, BATCH_SIZE):
+        await asyncio.gather(
+            *(
+                dp.feed_raw_update(bot, session.json_loads(raw))
+                for raw in raw_updates[i : i + BATCH_SIZE]
+            )
+        )
+    return updates / (time.perf_counter() - started)
+
+
+def main() -> None:
+    """Run the benchmark in both modes and print results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+
+    default = asyncio.run(run(args.updates, fast=False))
+    print(f"default (asyncio + json):  {default:,.0f} updates/s")
+
+    uvloop = install_event_loop_policy()
+    fast = asyncio.run(run(args.updates, fast=True))
+    label = "uvloop" if uvloop else "asyncio"
+    print(f"fast ({label} + orjson):  {fast:,.0f} updates/s ({fast / default:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Throughput benchmark of sharded update processing: 1 vs N workers.
+
+Each fake update burns CPU the way building captions and keyboards does,
+then waits a little to mimic a Telegram API call.
+
+Usage:
+    uv run python benchmarks/bench_sharding.py --updates 5000 --workers 4
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from sharding import ShardPool, get_update_key, serve_shard  # noqa: E402
+
+CPU_ROUNDS = 200
+IO_DELAY = 0.002
+
+
+async def handle_update(data: dict) -> None:
+    """Simulate a handler: render a payload, then await the API."""
+    payload = json.dumps(data)
+    for _ in range(CPU_ROUNDS):
+        payload = hashlib.sha256(payload.encode()).hexdigest()
+    await asyncio.sleep(IO_DELAY)
+
+
+def bench_worker(index: int, queue: Any) -> None:
+    """Shard worker entry point."""
+    asyncio.run(serve_shard(queue, handle_update))
+
+
+def make_update(update_id: int, users: int) -> dict:
+    """Build a fake callback query update."""
+    user_id = 1_000_000 + update_id % users
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": "bench"},
+            "data": f"vote:{update_id % 500}:like",
+        },
+    }
+
+
+async def run(workers: int, updates: int, users: int) -> float:
+    """Push updates through a pool of workers.
+
+    Returns:
+        Updates per second, including draining the queues
+    """
+    pool = ShardPool(bench_worker, workers, queue_size=100)
+    pool.start()
+    # Let workers finish spawning so startup is not measured
+    await asyncio.sleep(1.0)
+
+    started = time.perf_counter()
+    for update_id in range(updates):
+        data = make_update(update_id, users)
+        await pool.dispatch(get_update_key(data), data)
+    await pool.stop()
+    return updates / (time.perf_counter() - started)
+
+
+def main() -> None:
+    """Run the benchmark and print results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for workers in sorted({1, args.workers}):
+        rate = asyncio.run(run(workers, args.updates, args.users))
+        print(f"{workers} worker(s): {rate:,.0f} updates/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Micro-benchmark of /vote card rendering: fresh render vs VoteCardCache.
+
+Usage:
+    uv run python benchmarks/bench_vote_cards.py --scrans 200 --renders 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from cards import VoteCardCache, render_vote_card  # noqa: E402
+
+
+def make_scran(scran_id: int) -> dict:
+    """Build a fake scran with characters that need escaping."""
+    return {
+        "id": scran_id,
+        "name": f"Шаурма <{scran_id}> & *острая*_{scran_id}",
+        "description": "С соусом & сыром, <b>без</b> лука" if scran_id % 2 else None,
+        "price": 199.99 + scran_id,
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scrans", type=int, default=200)
+    parser.add_argument("--renders", type=int, default=100000)
+    args = parser.parse_args()
+
+    scrans = [make_scran(i) for i in range(args.scrans)]
+    picks = [random.choice(scrans) for _ in range(args.renders)]
+
+    started = time.perf_counter()
+    for scran in picks:
+        render_vote_card(scran)
+    fresh = args.renders / (time.perf_counter() - started)
+
+    cache = VoteCardCache()
+    started = time.perf_counter()
+    for scran in picks:
+        cache.get(scran)
+    cached = args.renders / (time.perf_counter() - started)
+
+    print(f"fresh render: {fresh:,.0f} cards/s")
+    print(f"cached:       {cached:,.0f} cards/s ({cached / fresh:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Rendering and caching of /vote cards."""
+
+import html
+from dataclasses import dataclass
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from cache import TTLCache
+
+
+@dataclass(frozen=True, slots=True)
+class VoteCard:
+    """Rendered vote card payload, sent with parse_mode HTML."""
+
+    caption: str
+    reply_markup: InlineKeyboardMarkup
+
+
+def get_card_version(scran: dict) -> int:
+    """Get the content version of a scran card.
+
+    Args:
+        scran: Scran dictionary with name, description and price
+
+    Returns:
+        Hash of the fields shown on the card
+    """
+    return hash((scran["name"], scran.get("description"), scran["price"]))
+
+
+def render_vote_card(scran: dict) -> VoteCard:
+    """Render caption and like/dislike keyboard of a scran.
+
+    User-submitted text is HTML-escaped, so any name or description is safe
+    to send.
+
+    Args:
+        scran: Scran dictionary with id, name, description and price
+
+    Returns:
+        Rendered vote card
+    """
+    caption = f"<b>{html.escape(scran['name'])}</b>"
+    if scran.get("description"):
+        caption += f"\n\n{html.escape(scran['description'])}"
+    caption += f"\n\n💰 {scran['price']:.2f} ₽"
+
+    reply_markup = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="🤩 Слопал бы",
+                    callback_data=f"vote:{scran['id']}:like",
+                ),
+                InlineKeyboardButton(
+                    text="💩 Слоп",
+                    callback_data=f"vote:{scran['id']}:dislike",
+                ),
+            ]
+        ]
+    )
+    return VoteCard(caption=caption, reply_markup=reply_markup)
+
+
+class VoteCardCache:
+    """Bounded cache of rendered vote cards keyed by scran ID and content version.
+
+    A card is rendered once and shared by every user. Editing a scran changes
+    its version, so a stale card is never served; old versions age out.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 86400.0):
+        """Initialize cache.
+
+        Args:
+            maxsize: Maximum number of cached cards
+            ttl: Card lifetime in seconds
+        """
+        self.cards = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, scran: dict) -> VoteCard:
+        """Get the rendered card of a scran, rendering it on a miss.
+
+        Args:
+            scran: Scran dictionary with id, name, description and price
+
+        Returns:
+            Rendered vote card
+        """
+        key = (scran["id"], get_card_version(scran))
+        card = self.cards.get(key)
+        if card is None:
+            card = render_vote_card(scran)
+            self.cards.set(key, card)
+        return card
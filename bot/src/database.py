@@ -1,13 +1,74 @@
 """Database module for connecting to the shared PostgreSQL database."""
 
+import asyncio
 import logging
 import os
+import time
+from collections.abc import Awaitable, Callable
 from typing import Optional
 
 import asyncpg
 
+from cache import TTLCache
+from profiling import profiler
+
 logger = logging.getLogger(__name__)
 
+USER_SCRANS_PAGE_SIZE = 10
+
+# Pages of get_user_scrans keyed by telegram_id, shared by all Database instances
+user_scrans_cache = TTLCache(maxsize=1024, ttl=60)
+
+# Per-user counters computed from the raw tables, {where} narrows both sides
+USER_TOTALS_SQL = """
+    SELECT telegram_id,
+           SUM(votes)::integer AS votes_count,
+           SUM(likes)::integer AS likes_count,
+           SUM(suggested)::integer AS suggested_count,
+           SUM(approved)::integer AS approved_count
+    FROM (
+        SELECT telegram_id,
+               COUNT(*) AS votes,
+               COUNT(*) FILTER (WHERE is_like) AS likes,
+               0 AS suggested,
+               0 AS approved
+        FROM telegram_votes
+        WHERE TRUE {where}
+        GROUP BY telegram_id
+        UNION ALL
+        SELECT telegram_id, 0, 0,
+               COUNT(*),
+               COUNT(*) FILTER (WHERE approved)
+        FROM scrans
+        WHERE telegram_id IS NOT NULL {where}
+        GROUP BY telegram_id
+    ) AS user_totals
+    GROUP BY telegram_id
+"""
+
+
+def get_cached_user_scrans(
+    telegram_id: str,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    limit: int = USER_SCRANS_PAGE_SIZE,
+) -> dict | None:
+    """Get a cached page of Database.get_user_scrans without connecting.
+
+    Args:
+        telegram_id: Telegram user ID
+        before_id: Return scrans with ID lower than this one
+        after_id: Return scrans with ID higher than this one
+        limit: Page size
+
+    Returns:
+        Cached page or None on a cache miss
+    """
+    user_pages = user_scrans_cache.get(telegram_id)
+    if user_pages is None:
+        return None
+    return user_pages.get((before_id, after_id, limit))
+
 
 class Database:
     """Async database connection handler for PostgreSQL."""
@@ -16,6 +77,8 @@ class Database:
         """Initialize database connection."""
         self.connection: Optional[asyncpg.Connection] = None
         self.pool: Optional[asyncpg.Pool] = None
+        self.listen_connection: asyncpg.Connection | None = None
+        self.listener: tuple[str, Callable[..., None]] | None = None
 
     async def connect(self) -> None:
         """Establish database connection pool."""
@@ -33,12 +96,24 @@ class Database:
             password=password,
             min_size=1,
             max_size=10,
+            setup=self._setup_connection,
         )
         logger.debug(f"Connected to PostgreSQL database: {database}@{host}:{port}")
 
+    @staticmethod
+    async def _setup_connection(connection: asyncpg.Connection) -> None:
+        """Prepare a connection acquired from the pool."""
+        # Query durations for the on-demand profiler. The logger is attached
+        # only during a run, asyncpg times and logs every query while it is.
+        if profiler.enabled:
+            connection.add_query_logger(profiler.log_query)
+        else:
+            connection.remove_query_logger(profiler.log_query)
+
     async def close(self) -> None:
         """Close database connection pool."""
         if self.pool:
+            await self._release_listen_connection()
             await self.pool.close()
             self.pool = None
             logger.debug("Database connection pool closed")
@@ -61,7 +136,7 @@ class Database:
         if not self.pool:
             raise RuntimeError("Database not connected")
 
-        async with self.pool.acquire() as connection:
+        async with self.pool.acquire() as connection, connection.transaction():
             scran_id = await connection.fetchval(
                 """
                 INSERT INTO scrans (
@@ -76,44 +151,120 @@ class Database:
                 price,
                 telegram_id,
             )
+            await connection.execute(
+                """
+                INSERT INTO telegram_user_stats (telegram_id, suggested_count, updated_at)
+                VALUES ($1, 1, NOW())
+                ON CONFLICT (telegram_id) DO UPDATE
+                SET suggested_count = telegram_user_stats.suggested_count + 1,
+                    updated_at = NOW()
+                """,
+                telegram_id,
+            )
+
+        user_scrans_cache.pop(telegram_id)
 
         if scran_id is None:
             raise RuntimeError("Failed to get ID after insert")
         logger.info(f"Inserted scran with ID {scran_id}: {name}")
         return scran_id
 
-    async def get_user_scrans(self, telegram_id: str) -> list[dict]:
-        """Get all scrans suggested by a specific user.
+    async def get_user_scrans(
+        self,
+        telegram_id: str,
+        before_id: int | None = None,
+        after_id: int | None = None,
+        limit: int = USER_SCRANS_PAGE_SIZE,
+    ) -> dict:
+        """Get a page of scrans suggested by a specific user, newest first.
+
+        Pages are addressed by keyset: before_id returns older scrans,
+        after_id returns newer ones. Pages are cached per user until the
+        user's scrans change or the cache entry expires.
 
         Args:
             telegram_id: Telegram user ID
+            before_id: Return scrans with ID lower than this one
+            after_id: Return scrans with ID higher than this one
+            limit: Page size
 
         Returns:
-            List of scran dictionaries
+            Dictionary with "scrans" list and "has_older"/"has_newer" flags
         """
         if not self.pool:
             raise RuntimeError("Database not connected")
 
+        page = get_cached_user_scrans(telegram_id, before_id, after_id, limit)
+        if page is not None:
+            return page
+
         async with self.pool.acquire() as connection:
-            rows = await connection.fetch(
-                """
-                SELECT id, name, approved
-                FROM scrans
-                WHERE telegram_id = $1
-                ORDER BY id DESC
-                LIMIT 20
-                """,
-                telegram_id,
-            )
+            if after_id is not None:
+                rows = await connection.fetch(
+                    """
+                    SELECT id, name, approved
+                    FROM scrans
+                    WHERE telegram_id = $1 AND id > $2
+                    ORDER BY id ASC
+                    LIMIT $3
+                    """,
+                    telegram_id,
+                    after_id,
+                    limit + 1,
+                )
+                has_newer = len(rows) > limit
+                rows = list(reversed(rows[:limit]))
+                has_older = True
+            else:
+                # Separate queries keep the cursor an index condition in generic plans
+                if before_id is not None:
+                    rows = await connection.fetch(
+                        """
+                        SELECT id, name, approved
+                        FROM scrans
+                        WHERE telegram_id = $1 AND id < $2
+                        ORDER BY id DESC
+                        LIMIT $3
+                        """,
+                        telegram_id,
+                        before_id,
+                        limit + 1,
+                    )
+                else:
+                    rows = await connection.fetch(
+                        """
+                        SELECT id, name, approved
+                        FROM scrans
+                        WHERE telegram_id = $1
+                        ORDER BY id DESC
+                        LIMIT $2
+                        """,
+                        telegram_id,
+                        limit + 1,
+                    )
+                has_older = len(rows) > limit
+                rows = rows[:limit]
+                has_newer = before_id is not None
+
+        page = {
+            "scrans": [
+                {
+                    "id": row["id"],
+                    "name": row["name"],
+                    "approved": row["approved"],
+                }
+                for row in rows
+            ],
+            "has_older": has_older,
+            "has_newer": has_newer,
+        }
 
-        return [
-            {
-                "id": row["id"],
-                "name": row["name"],
-                "approved": row["approved"],
-            }
-            for row in rows
-        ]
+        user_pages = user_scrans_cache.get(telegram_id)
+        if user_pages is None:
+            user_pages = {}
+            user_scrans_cache.set(telegram_id, user_pages)
+        user_pages[(before_id, after_id, limit)] = page
+        return page
 
     async def get_scran_by_id(self, scran_id: int) -> Optional[dict]:
         """Get a scran by its ID.
@@ -155,12 +306,20 @@ class Database:
         if not self.pool:
             raise RuntimeError("Database not connected")
 
+        # approved_count is updated by the scran_approved_user_stats trigger
         async with self.pool.acquire() as connection:
-            await connection.execute(
-                "UPDATE scrans SET approved = true WHERE id = $1",
+            row = await connection.fetchrow(
+                """
+                UPDATE scrans SET approved = true
+                WHERE id = $1 AND approved = false
+                RETURNING telegram_id
+                """,
                 scran_id,
             )
 
+        if row and row["telegram_id"]:
+            user_scrans_cache.pop(row["telegram_id"])
+
         logger.info(f"Approved scran {scran_id}")
         return True
 
@@ -316,7 +475,7 @@ class Database:
         if not self.pool:
             raise RuntimeError("Database not connected")
 
-        async with self.pool.acquire() as connection:
+        async with self.pool.acquire() as connection, connection.transaction():
             await connection.execute(
                 """
                 INSERT INTO telegram_votes (telegram_id, scran_id, is_like, created_at)
@@ -326,5 +485,442 @@ class Database:
                 scran_id,
                 is_like,
             )
+            await connection.execute(
+                """
+                INSERT INTO telegram_user_stats (telegram_id, votes_count, likes_count, updated_at)
+                VALUES ($1, 1, $2, NOW())
+                ON CONFLICT (telegram_id) DO UPDATE
+                SET votes_count = telegram_user_stats.votes_count + 1,
+                    likes_count = telegram_user_stats.likes_count + EXCLUDED.likes_count,
+                    updated_at = NOW()
+                """,
+                telegram_id,
+                int(is_like),
+            )
 
         logger.info(f"Telegram vote recorded: user {telegram_id}, scran {scran_id}, like={is_like}")
+
+    async def get_scheduled_dates(self, from_date: str) -> set[str]:
+        """Get dates that already have daily scrandle rounds.
+
+        Args:
+            from_date: First date to check (YYYY-MM-DD)
+
+        Returns:
+            Set of dates (YYYY-MM-DD) with at least one round
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(
+                """
+                SELECT DISTINCT date
+                FROM daily_scrandles
+                WHERE date >= $1
+                """,
+                from_date,
+            )
+
+        return {row["date"] for row in rows}
+
+    async def get_recent_daily_scran_ids(self, since_date: str) -> set[int]:
+        """Get IDs of scrans used in daily rounds since a date.
+
+        Args:
+            since_date: First date of the window (YYYY-MM-DD)
+
+        Returns:
+            Set of scran IDs used on or after since_date
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(
+                """
+                SELECT scran_a_id, scran_b_id
+                FROM daily_scrandles
+                WHERE date >= $1
+                """,
+                since_date,
+            )
+
+        used_ids: set[int] = set()
+        for row in rows:
+            used_ids.add(row["scran_a_id"])
+            used_ids.add(row["scran_b_id"])
+        return used_ids
+
+    async def get_daily_candidates(self, min_votes: int) -> list[dict]:
+        """Get approved scrans with enough votes to be used in daily rounds.
+
+        Args:
+            min_votes: Minimum number of votes (likes + dislikes), exclusive
+
+        Returns:
+            List of scran dictionaries with vote counts
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(
+                """
+                SELECT id, number_of_likes, number_of_dislikes
+                FROM scrans
+                WHERE approved = true
+                  AND number_of_likes + number_of_dislikes > $1
+                """,
+                min_votes,
+            )
+
+        return [
+            {
+                "id": row["id"],
+                "number_of_likes": row["number_of_likes"],
+                "number_of_dislikes": row["number_of_dislikes"],
+            }
+            for row in rows
+        ]
+
+    async def insert_daily_rounds(self, date: str, pairs: list[tuple[int, int]]) -> int:
+        """Insert daily scrandle rounds for a date.
+
+        Rounds are numbered from 1 in the order of pairs. Rounds that already
+        exist for the date (unique_round_per_day) are left untouched, so the
+        call is idempotent.
+
+        Args:
+            date: Date of the rounds (YYYY-MM-DD)
+            pairs: List of (scran_a_id, scran_b_id) tuples
+
+        Returns:
+            Number of rounds actually inserted
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        async with self.pool.acquire() as connection, connection.transaction():
+            inserted = 0
+            for round_number, (scran_a_id, scran_b_id) in enumerate(pairs, 1):
+                status = await connection.execute(
+                    """
+                    INSERT INTO daily_scrandles (
+                        date, scran_a_id, scran_b_id, round_number, created_at
+                    ) VALUES ($1, $2, $3, $4, NOW())
+                    ON CONFLICT (date, round_number) DO NOTHING
+                    """,
+                    date,
+                    scran_a_id,
+                    scran_b_id,
+                    round_number,
+                )
+                inserted += int(status.split()[-1])
+
+        logger.info(f"Inserted {inserted} daily rounds for {date}")
+        return inserted
+
+    async def get_user_stats(self, telegram_id: str) -> dict | None:
+        """Get summary stats of a Telegram user.
+
+        Args:
+            telegram_id: Telegram user ID
+
+        Returns:
+            Stats dictionary or None if the user has no activity
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        async with self.pool.acquire() as connection:
+            row = await connection.fetchrow(
+                """
+                SELECT votes_count, likes_count, suggested_count, approved_count
+                FROM telegram_user_stats
+                WHERE telegram_id = $1
+                """,
+                telegram_id,
+            )
+
+        if not row:
+            return None
+
+        return {
+            "votes_count": row["votes_count"],
+            "likes_count": row["likes_count"],
+            "suggested_count": row["suggested_count"],
+            "approved_count": row["approved_count"],
+        }
+
+    async def get_top_scrans(self, limit: int = 10, min_votes: int = 3) -> list[dict]:
+        """Get approved scrans with the highest likes percentage.
+
+        Args:
+            limit: Number of scrans to return
+            min_votes: Minimum number of votes (likes + dislikes), exclusive
+
+        Returns:
+            List of scran dictionaries with vote counts
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(
+                """
+                SELECT id, name, number_of_likes, number_of_dislikes
+                FROM scrans
+                WHERE approved = true
+                  AND number_of_likes + number_of_dislikes > $1
+                ORDER BY number_of_likes::real / (number_of_likes + number_of_dislikes) DESC,
+                         number_of_likes DESC
+                LIMIT $2
+                """,
+                min_votes,
+                limit,
+            )
+
+        return [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "number_of_likes": row["number_of_likes"],
+                "number_of_dislikes": row["number_of_dislikes"],
+            }
+            for row in rows
+        ]
+
+    async def reconcile_user_stats(self) -> int:
+        """Recompute telegram_user_stats from telegram_votes and scrans.
+
+        Drifted users are found without blocking writers, then their rows are
+        locked and recounted from a snapshot taken after the lock. Increments
+        committed before the lock are counted and later ones wait for it, so a
+        concurrent vote is never overwritten.
+
+        Returns:
+            Number of corrected rows
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        async with self.pool.acquire() as connection:
+            drifted = await connection.fetch(
+                f"""
+                SELECT totals.telegram_id
+                FROM ({USER_TOTALS_SQL.format(where="")}) AS totals
+                LEFT JOIN telegram_user_stats AS stats USING (telegram_id)
+                WHERE (
+                    stats.votes_count, stats.likes_count,
+                    stats.suggested_count, stats.approved_count
+                ) IS DISTINCT FROM (
+                    totals.votes_count, totals.likes_count,
+                    totals.suggested_count, totals.approved_count
+                )
+                """
+            )
+            if not drifted:
+                return 0
+
+            telegram_ids = [row["telegram_id"] for row in drifted]
+            totals_sql = USER_TOTALS_SQL.format(where="AND telegram_id = ANY($1::text[])")
+            async with connection.transaction():
+                await connection.execute(
+                    """
+                    SELECT 1 FROM telegram_user_stats
+                    WHERE telegram_id = ANY($1::text[])
+                    ORDER BY telegram_id
+                    FOR UPDATE
+                    """,
+                    telegram_ids,
+                )
+                updated = await connection.execute(
+                    f"""
+                    UPDATE telegram_user_stats AS stats
+                    SET votes_count = totals.votes_count,
+                        likes_count = totals.likes_count,
+                        suggested_count = totals.suggested_count,
+                        approved_count = totals.approved_count,
+                        updated_at = NOW()
+                    FROM ({totals_sql}) AS totals
+                    WHERE stats.telegram_id = totals.telegram_id
+                      AND (
+                          stats.votes_count, stats.likes_count,
+                          stats.suggested_count, stats.approved_count
+                      ) IS DISTINCT FROM (
+                          totals.votes_count, totals.likes_count,
+                          totals.suggested_count, totals.approved_count
+                      )
+                    """,
+                    telegram_ids,
+                )
+                # A row created concurrently is left to its own increments
+                inserted = await connection.execute(
+                    f"""
+                    INSERT INTO telegram_user_stats (
+                        telegram_id, votes_count, likes_count,
+                        suggested_count, approved_count, updated_at
+                    )
+                    SELECT telegram_id, votes_count, likes_count,
+                           suggested_count, approved_count, NOW()
+                    FROM ({totals_sql}) AS totals
+                    ON CONFLICT (telegram_id) DO NOTHING
+                    """,
+                    telegram_ids,
+                )
+
+        corrected = int(updated.split()[-1]) + int(inserted.split()[-1])
+        if corrected:
+            logger.info(f"Reconciled user stats: {corrected} rows corrected")
+        return corrected
+
+    async def get_max_id(self, table: str, timeout: float = 60.0) -> int:
+        """Get the highest ID of a table once no lower ID can still appear.
+
+        An ID allocated by a transaction that is still running shows up only
+        after it commits, possibly below the current MAX(id). The returned ID
+        is safe as an export upper bound, because it waits until every
+        transaction of this database running at the time of the read has ended.
+
+        Args:
+            table: Trusted table name
+            timeout: Seconds to wait for running transactions
+
+        Returns:
+            Highest ID, 0 if the table is empty
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        async with self.pool.acquire() as connection:
+            max_id = await connection.fetchval(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            # Read after MAX(id): a writer invisible to it is either listed here or committed
+            running = await connection.fetchval(
+                """
+                SELECT array_agg(backend_xid)
+                FROM pg_stat_activity
+                WHERE datname = current_database() AND backend_xid IS NOT NULL
+                """
+            )
+            deadline = time.monotonic() + timeout
+            while running and await connection.fetchval(
+                """
+                SELECT EXISTS (
+                    SELECT 1 FROM pg_stat_activity
+                    WHERE datname = current_database() AND backend_xid = ANY($1::xid[])
+                )
+                """,
+                running,
+            ):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Transactions writing {table} did not finish in time")
+                await asyncio.sleep(0.1)
+
+        return max_id
+
+    async def copy_rows_to_csv(
+        self,
+        table: str,
+        columns: list[str],
+        since_id: int,
+        upto_id: int,
+        output: Callable[[bytes], Awaitable[None]],
+    ) -> int:
+        """Stream rows with since_id < id <= upto_id as CSV using COPY.
+
+        Rows are never loaded into memory: every chunk is passed to output
+        as soon as it arrives, and the next one is read after it returns.
+
+        Args:
+            table: Trusted table name
+            columns: Trusted column names
+            since_id: Exclusive lower bound of IDs
+            upto_id: Inclusive upper bound of IDs
+            output: Coroutine function receiving CSV chunks
+
+        Returns:
+            Number of copied rows
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        async with self.pool.acquire() as connection:
+            status = await connection.copy_from_query(
+                f"""
+                SELECT {", ".join(columns)}
+                FROM {table}
+                WHERE id > $1 AND id <= $2
+                ORDER BY id
+                """,
+                since_id,
+                upto_id,
+                output=output,
+                format="csv",
+                header=True,
+            )
+
+        return int(status.split()[-1])
+
+    async def listen(self, channel: str, callback: Callable[..., None]) -> None:
+        """Subscribe to a NOTIFY channel on a dedicated pool connection.
+
+        Calling it again replaces the previous listening connection, e.g.
+        after it was closed.
+
+        Args:
+            channel: Channel name
+            callback: asyncpg listener called as callback(connection, pid, channel, payload)
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        await self._release_listen_connection()
+        self.listen_connection = await self.pool.acquire()
+        await self.listen_connection.add_listener(channel, callback)
+        self.listener = (channel, callback)
+        logger.debug(f"Listening on channel {channel}")
+
+    async def _release_listen_connection(self) -> None:
+        """Unsubscribe and return the listening connection to the pool."""
+        if not self.pool or not self.listen_connection:
+            return
+
+        if self.listener and not self.listen_connection.is_closed():
+            await self.listen_connection.remove_listener(*self.listener)
+        await self.pool.release(self.listen_connection)
+        self.listen_connection = None
+        self.listener = None
+
+    async def get_scrans_by_ids(self, scran_ids: list[int]) -> list[dict]:
+        """Get scrans by their IDs.
+
+        Args:
+            scran_ids: Scran IDs
+
+        Returns:
+            List of scran dictionaries ordered by ID
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(
+                """
+                SELECT id, name, approved, telegram_id
+                FROM scrans
+                WHERE id = ANY($1::integer[])
+                ORDER BY id
+                """,
+                scran_ids,
+            )
+
+        return [
+            {
+                "id": row["id"],
+                "name": row["name"],
+                "approved": row["approved"],
+                "telegram_id": row["telegram_id"],
+            }
+            for row in rows
+        ]
@@ -0,0 +1,255 @@
+"""Streaming export of votes and scrans to compressed CSV or Parquet.
+
+Usage:
+    uv run python src/export.py --output exports --format csv
+    uv run python src/export.py --tables scrans --format parquet --full
+"""
+
+import argparse
+import asyncio
+import fcntl
+import gzip
+import json
+import logging
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = Path(os.getenv("EXPORT_DIR", "/app/exports"))
+
+# Exported columns and their Parquet (pyarrow) types
+EXPORT_TABLES: dict[str, dict[str, str]] = {
+    "telegram_votes": {
+        "id": "int32",
+        "telegram_id": "string",
+        "scran_id": "int32",
+        "is_like": "bool",
+        "created_at": "timestamp[us]",
+    },
+    "scrandle_votes": {
+        "id": "int32",
+        "daily_scrandle_id": "int32",
+        "session_id": "string",
+        "fingerprint_hash": "string",
+        "chosen_scran_id": "int32",
+        "created_at": "timestamp[us]",
+    },
+    "scrans": {
+        "id": "int32",
+        "image_url": "string",
+        "name": "string",
+        "description": "string",
+        "price": "float",
+        "number_of_likes": "int32",
+        "number_of_dislikes": "int32",
+        "approved": "bool",
+        "telegram_id": "string",
+    },
+}
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+# Last exported ID per table, used by incremental exports
+WATERMARKS_FILE = "watermarks.json"
+
+# Exports share watermarks and file names, so they run one at a time
+LOCK_FILE = ".export.lock"
+
+
+def convert_to_parquet(csv_path: Path, parquet_path: Path, columns: dict[str, str]) -> None:
+    """Convert a gzipped CSV export to Parquet batch by batch.
+
+    Args:
+        csv_path: Path to the .csv.gz file written by COPY
+        parquet_path: Path of the Parquet file to write
+        columns: Column names and pyarrow type aliases
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    convert_options = pa_csv.ConvertOptions(
+        column_types={name: pa.type_for_alias(alias) for name, alias in columns.items()},
+        true_values=["t"],
+        false_values=["f"],
+        strings_can_be_null=True,
+    )
+    with pa.input_stream(str(csv_path), compression="gzip") as stream:
+        reader = pa_csv.open_csv(
+            stream,
+            read_options=pa_csv.ReadOptions(block_size=4 * 1024 * 1024),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=convert_options,
+        )
+        with pq.ParquetWriter(str(parquet_path), reader.schema, compression="zstd") as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+
+
+async def export_table(
+    database: Database,
+    table: str,
+    output_dir: Path,
+    since_id: int = 0,
+    fmt: str = "csv",
+) -> dict:
+    """Export rows of a table with id > since_id.
+
+    Rows are streamed from COPY straight into a gzip file, so memory use
+    does not depend on the table size. Compression and Parquet conversion
+    run in a thread to keep the event loop free.
+
+    Args:
+        database: Connected database
+        table: Table name, one of EXPORT_TABLES
+        output_dir: Directory for the export file
+        since_id: Export rows with ID greater than this one
+        fmt: "csv" (gzipped) or "parquet"
+
+    Returns:
+        Dictionary with table, path, rows and watermark (last exported ID)
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table: {table}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("Parquet export requires pyarrow: uv sync --extra export") from e
+
+    columns = EXPORT_TABLES[table]
+    upto_id = await database.get_max_id(table)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    base = output_dir / f"{table}_{since_id}_{upto_id}"
+    csv_path = Path(f"{base}.csv.gz")
+
+    loop = asyncio.get_running_loop()
+    with gzip.open(csv_path, "wb") as gz:
+
+        async def write_chunk(chunk: bytes) -> None:
+            await loop.run_in_executor(None, gz.write, chunk)
+
+        rows = await database.copy_rows_to_csv(
+            table, list(columns), since_id, upto_id, output=write_chunk
+        )
+
+    path = csv_path
+    if fmt == "parquet":
+        path = Path(f"{base}.parquet")
+        await loop.run_in_executor(None, convert_to_parquet, csv_path, path, columns)
+        csv_path.unlink()
+
+    logger.info(f"Exported {rows} rows of {table} to {path}")
+    return {"table": table, "path": path, "rows": rows, "watermark": upto_id}
+
+
+@asynccontextmanager
+async def export_lock(output_dir: Path) -> AsyncIterator[None]:
+    """Hold an exclusive lock on an export directory.
+
+    The lock is a flock on a file in the directory, so it also serializes
+    exports of other processes, like shard workers and the CLI.
+
+    Args:
+        output_dir: Directory for export files and watermarks
+    """
+    with open(output_dir / LOCK_FILE, "w") as lock_file:
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(0.5)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_watermarks(output_dir: Path) -> dict[str, int]:
+    """Load last exported IDs from the output directory."""
+    path = output_dir / WATERMARKS_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_watermarks(output_dir: Path, watermarks: dict[str, int]) -> None:
+    """Save last exported IDs to the output directory."""
+    (output_dir / WATERMARKS_FILE).write_text(json.dumps(watermarks, indent=2))
+
+
+async def run_export(
+    tables: list[str],
+    output_dir: Path = EXPORT_DIR,
+    fmt: str = "csv",
+    incremental: bool = True,
+) -> list[dict]:
+    """Export tables with a dedicated connection pool.
+
+    Concurrent exports to the same directory wait for each other. Each
+    table's watermark is saved as soon as its file is written.
+
+    Args:
+        tables: Table names, each one of EXPORT_TABLES
+        output_dir: Directory for export files and watermarks
+        fmt: "csv" (gzipped) or "parquet"
+        incremental: Only export rows added since the previous export
+
+    Returns:
+        List of export results, see export_table
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    async with export_lock(output_dir):
+        watermarks = load_watermarks(output_dir)
+        results = []
+
+        # Own pool, so exports never take connections from update handlers
+        database = Database()
+        await database.connect()
+        try:
+            for table in tables:
+                since_id = watermarks.get(table, 0) if incremental else 0
+                result = await export_table(database, table, output_dir, since_id, fmt)
+                watermarks[table] = result["watermark"]
+                save_watermarks(output_dir, watermarks)
+                results.append(result)
+        finally:
+            await database.close()
+
+        return results
+
+
+def main() -> None:
+    """CLI entry point."""
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    parser = argparse.ArgumentParser(description="Export votes and scrans.")
+    parser.add_argument(
+        "--tables", nargs="+", choices=list(EXPORT_TABLES), default=list(EXPORT_TABLES)
+    )
+    parser.add_argument("--output", type=Path, default=EXPORT_DIR)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--full", action="store_true", help="ignore watermarks and export all rows")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_export(args.tables, args.output, args.format, not args.full))
+    for result in results:
+        print(f"{result['table']}: {result['rows']} rows -> {result['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,10 @@
 import asyncio
 import logging
 import os
+import signal
 import uuid
-from contextlib import asynccontextmanager
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 from typing import Any
 
@@ -31,7 +33,21 @@ from aiogram.exceptions import TelegramAPIError
 from aiogram.utils.media_group import MediaGroupBuilder
 from dotenv import load_dotenv
 
-from database import Database
+from cards import VoteCardCache
+from database import Database, get_cached_user_scrans
+from export import EXPORT_FORMATS, EXPORT_TABLES, run_export
+from middlewares import (
+    DeduplicateUpdatesMiddleware,
+    ProfilingMiddleware,
+    ProfilingRequestMiddleware,
+    VoteDebounceMiddleware,
+)
+from notifier import INVALIDATE_USER_SCRANS, ApprovalNotifier, invalidate_local_user_scrans
+from profiling import PROFILE_SECONDS, install_signal_handler, profiler
+from runtime import FAST_RUNTIME, create_session, install_event_loop_policy
+from scheduler import DailyScheduler, get_likes_percentage
+from sharding import ShardPool, run_sharded_polling, serve_shard
+from stats import StatsReconciler
 
 # Load environment variables
 load_dotenv()
@@ -49,14 +65,45 @@ if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN environment variable is not set")
 
 # Initialize bot and dispatcher
-bot = Bot(token=BOT_TOKEN)
+bot = Bot(token=BOT_TOKEN, session=create_session())
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
 router = Router()
 
+# Drop retried updates and repeated vote taps before they reach the database
+VOTE_DEBOUNCE_SECONDS = float(os.getenv("VOTE_DEBOUNCE_SECONDS", "3"))
+dp.update.outer_middleware(DeduplicateUpdatesMiddleware())
+router.callback_query.outer_middleware(VoteDebounceMiddleware(window=VOTE_DEBOUNCE_SECONDS))
+
+# On-demand profiling hooks, no-ops until /profile or SIGUSR1
+dp.update.outer_middleware(ProfilingMiddleware())
+bot.session.middleware(ProfilingRequestMiddleware())
+
 # Initialize database
 db = Database()
 
+# Strong references to fire-and-forget tasks
+background_tasks: set[asyncio.Task] = set()
+
+# Rendered /vote cards
+vote_cards = VoteCardCache()
+
+# Stats reconciler, also holds the top scrans snapshot for /top
+stats_reconciler = StatsReconciler()
+
+# Telegram IDs allowed to use admin commands
+ADMIN_TELEGRAM_IDS = {
+    int(admin_id) for admin_id in os.getenv("ADMIN_TELEGRAM_IDS", "").split(",") if admin_id.strip()
+}
+
+# Telegram rejects documents larger than 50 MB
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+
+# Sharded mode: a front process polls and BOT_WORKERS processes handle updates
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+BOT_WORKER_QUEUE_SIZE = int(os.getenv("BOT_WORKER_QUEUE_SIZE", "100"))
+BOT_WORKER_CONCURRENCY = int(os.getenv("BOT_WORKER_CONCURRENCY", "32"))
+
 # Upload configuration
 UPLOADS_DIR = Path("/app/uploads")
 UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
@@ -78,7 +125,8 @@ async def save_uploaded_photo(file_id: str) -> str:
         raise ValueError("File path not available")
 
     # Download file content
-    file_content = await bot.download_file(file.file_path)
+    with profiler.span("telegram", "download_file"):
+        file_content = await bot.download_file(file.file_path)
 
     if not file_content:
         raise ValueError("Failed to download file content")
@@ -89,8 +137,9 @@ async def save_uploaded_photo(file_id: str) -> str:
     local_path = UPLOADS_DIR / filename
 
     # Save file locally
-    async with aiofiles.open(local_path, "wb") as f:
-        await f.write(file_content.read())
+    with profiler.span("file", "save_uploaded_photo"):
+        async with aiofiles.open(local_path, "wb") as f:
+            await f.write(file_content.read())
 
     # Return URL path (accessible via Next.js)
     return f"/uploads/{filename}"
@@ -166,6 +215,8 @@ async def cmd_help(message: Message) -> None:
         "Команды:\n"
         "/suggest - Предложить блюдо\n"
         "/vote - Проголосовать за блюда\n"
+        "/stats - Твоя статистика\n"
+        "/top - Лучшие блюда\n"
         "/help - Эта помощь"
     )
     await message.answer(help_text)
@@ -206,37 +257,18 @@ async def cmd_vote(message: Message, user_id: str | None = None) -> None:
 
             scran = random.choice(available_scrans)
 
-            # Build caption with name, description and price
-            caption = f"*{scran['name']}*"
-            if scran.get("description"):
-                caption += f"\n\n{scran['description']}"
-            caption += f"\n\n💰 {scran['price']:.2f} ₽"
+            # Rendered caption and keyboard are shared by all users
+            card = vote_cards.get(scran)
 
             # Handle local files vs external URLs
             media = get_media_input(scran["image_url"])
 
-            # Create inline keyboard with like/dislike buttons
-            keyboard = InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        InlineKeyboardButton(
-                            text="🤩 Слопал бы",
-                            callback_data=f"vote:{scran['id']}:like",
-                        ),
-                        InlineKeyboardButton(
-                            text="💩 Слоп",
-                            callback_data=f"vote:{scran['id']}:dislike",
-                        ),
-                    ]
-                ]
-            )
-
             # Send photo with caption and buttons
             await message.answer_photo(
                 photo=media,
-                caption=caption,
-                reply_markup=keyboard,
-                parse_mode="Markdown",
+                caption=card.caption,
+                reply_markup=card.reply_markup,
+                parse_mode=ParseMode.HTML,
             )
 
     except Exception as e:
@@ -526,6 +558,40 @@ async def cancel_suggestion(message: Message, state: FSMContext) -> None:
     )
 
 
+def build_status_page(page: dict) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Build /status message text and navigation keyboard for a page.
+
+    Args:
+        page: Page returned by Database.get_user_scrans
+
+    Returns:
+        Tuple of message text and inline keyboard (None if there is one page)
+    """
+    response = "📊 Твои предложения:\n\n"
+    for scran in page["scrans"]:
+        status = "✅ Одобрено" if scran["approved"] else "⏳ На рассмотрении"
+        response += f"• {scran['name']} - {status}\n"
+
+    buttons = []
+    if page["has_newer"]:
+        buttons.append(
+            InlineKeyboardButton(
+                text="⬅️ Новее",
+                callback_data=f"status:newer:{page['scrans'][0]['id']}",
+            )
+        )
+    if page["has_older"]:
+        buttons.append(
+            InlineKeyboardButton(
+                text="Старее ➡️",
+                callback_data=f"status:older:{page['scrans'][-1]['id']}",
+            )
+        )
+
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+    return response, keyboard
+
+
 @router.message(Command("status"))
 async def cmd_status(message: Message) -> None:
     """Handle /status command."""
@@ -536,27 +602,198 @@ async def cmd_status(message: Message) -> None:
     telegram_id = str(message.from_user.id)
 
     try:
-        async with database_session() as database:
-            user_scrans = await database.get_user_scrans(telegram_id)
+        # Cached pages are served without opening a database session
+        page = get_cached_user_scrans(telegram_id)
+        if page is None:
+            async with database_session() as database:
+                page = await database.get_user_scrans(telegram_id)
 
-        if not user_scrans:
+        if not page["scrans"]:
             await message.answer(
                 "У тебя пока нет предложений. Используй /suggest чтобы добавить блюдо!"
             )
             return
 
-        response = "📊 Твои предложения:\n\n"
-        for i, scran in enumerate(user_scrans, 1):
-            status = "✅ Одобрено" if scran["approved"] else "⏳ На рассмотрении"
-            response += f"{i}. {scran['name']} - {status}\n"
-
-        await message.answer(response)
+        response, keyboard = build_status_page(page)
+        await message.answer(response, reply_markup=keyboard)
 
     except Exception as e:
         logger.error(f"Error fetching status: {e}")
         await message.answer("Произошла ошибка при получении статуса. Попробуй позже.")
 
 
+@router.callback_query(F.data.startswith("status:"))
+async def process_status_page(callback: CallbackQuery) -> None:
+    """Handle /status pagination callback."""
+    try:
+        if not callback.data or not callback.from_user:
+            await callback.answer("Ошибка в данных страницы")
+            return
+
+        # Parse callback data: status:older|newer:scran_id
+        data_parts = callback.data.split(":")
+        if len(data_parts) != 3 or data_parts[1] not in ("older", "newer"):
+            await callback.answer("Ошибка в данных страницы")
+            return
+
+        _, direction, cursor = data_parts
+        cursor_id = int(cursor)
+        telegram_id = str(callback.from_user.id)
+
+        before_id = cursor_id if direction == "older" else None
+        after_id = cursor_id if direction == "newer" else None
+
+        # Cached pages are served without opening a database session
+        page = get_cached_user_scrans(telegram_id, before_id, after_id)
+        if page is None:
+            async with database_session() as database:
+                page = await database.get_user_scrans(telegram_id, before_id, after_id)
+
+        if not page["scrans"]:
+            await callback.answer("Больше предложений нет")
+            return
+
+        response, keyboard = build_status_page(page)
+        if callback.message and isinstance(callback.message, Message):
+            # Message might be too old or unchanged
+            with suppress(TelegramAPIError):
+                await callback.message.edit_text(response, reply_markup=keyboard)
+
+        await callback.answer()
+
+    except Exception as e:
+        logger.error(f"Error fetching status page: {e}")
+        await callback.answer("❌ Ошибка при загрузке страницы")
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message) -> None:
+    """Handle /stats command."""
+    if not message.from_user:
+        await message.answer("Ошибка: не удалось получить информацию о пользователе.")
+        return
+
+    telegram_id = str(message.from_user.id)
+
+    try:
+        async with database_session() as database:
+            stats = await database.get_user_stats(telegram_id)
+
+        if not stats:
+            await message.answer(
+                "У тебя пока нет статистики. Используй /vote или /suggest, чтобы начать!"
+            )
+            return
+
+        response = (
+            "📈 Твоя статистика:\n\n"
+            f"🗳 Голосов: {stats['votes_count']}\n"
+            f"🤩 Слопал бы: {stats['likes_count']}\n"
+            f"💩 Слоп: {stats['votes_count'] - stats['likes_count']}\n"
+            f"📝 Предложено блюд: {stats['suggested_count']}\n"
+            f"✅ Одобрено: {stats['approved_count']}"
+        )
+        if stats["suggested_count"]:
+            approval_rate = stats["approved_count"] / stats["suggested_count"] * 100
+            response += f" ({approval_rate:.0f}%)"
+
+        await message.answer(response)
+
+    except Exception as e:
+        logger.error(f"Error fetching stats: {e}")
+        await message.answer("Произошла ошибка при получении статистики. Попробуй позже.")
+
+
+@router.message(Command("top"))
+async def cmd_top(message: Message) -> None:
+    """Handle /top command."""
+    top_scrans = stats_reconciler.top_scrans
+
+    if not top_scrans:
+        await message.answer("Рейтинг пока пуст. Загляни позже!")
+        return
+
+    response = "🏆 Лучшие блюда:\n\n"
+    for i, scran in enumerate(top_scrans, 1):
+        percentage = get_likes_percentage(scran)
+        response += f"{i}. {scran['name']} - {percentage:.0f}% 🤩\n"
+
+    await message.answer(response)
+
+
+async def send_export(message: Message, fmt: str, incremental: bool) -> None:
+    """Run an export and send the resulting files to the admin."""
+    try:
+        results = await run_export(list(EXPORT_TABLES), fmt=fmt, incremental=incremental)
+        for result in results:
+            path = result["path"]
+            summary = f"📦 {result['table']}: {result['rows']} строк (до id {result['watermark']})"
+            if path.stat().st_size <= MAX_DOCUMENT_SIZE:
+                await message.answer_document(FSInputFile(str(path)), caption=summary)
+            else:
+                await message.answer(f"{summary}\nФайл слишком большой, лежит в {path}")
+    except Exception as e:
+        logger.error(f"Error exporting data: {e}")
+        await message.answer("❌ Ошибка при выгрузке данных.")
+
+
+@router.message(Command("export"), F.from_user.id.in_(ADMIN_TELEGRAM_IDS))
+async def cmd_export(message: Message) -> None:
+    """Handle /export [csv|parquet] [full] admin command."""
+    args = (message.text or "").split()[1:]
+    fmt = next((arg for arg in args if arg in EXPORT_FORMATS), "csv")
+    incremental = "full" not in args
+
+    # Export runs in the background so handlers are not held up
+    task = asyncio.create_task(send_export(message, fmt, incremental))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+    await message.answer("⏳ Выгрузка началась, пришлю файлы, когда будет готово.")
+
+
+async def send_profile(message: Message, done: asyncio.Future) -> None:
+    """Wait for profiling to finish and send the results to the admin."""
+    try:
+        paths = await done
+        lines = [
+            f"{entry['await']}: {entry['count']}× {entry['total_ms']:.0f} мс "
+            f"(p95 {entry['p95_ms']:.1f} мс)"
+            for entry in profiler.summary(limit=10)
+        ]
+        await message.answer("🔬 Профиль готов:\n\n" + ("\n".join(lines) or "Нет данных"))
+        for path in paths:
+            await message.answer_document(FSInputFile(str(path)))
+    except Exception as e:
+        logger.error(f"Error sending profile: {e}")
+        await message.answer("❌ Ошибка при сохранении профиля.")
+
+
+@router.message(Command("profile"), F.from_user.id.in_(ADMIN_TELEGRAM_IDS))
+async def cmd_profile(message: Message) -> None:
+    """Handle /profile [seconds] [updates] admin command."""
+    args = (message.text or "").split()[1:]
+    try:
+        seconds = float(args[0]) if args else PROFILE_SECONDS
+        updates = int(args[1]) if len(args) > 1 else 0
+    except ValueError:
+        await message.answer("Использование: /profile [секунды] [число апдейтов]")
+        return
+
+    try:
+        done = profiler.start(seconds, updates)
+    except RuntimeError:
+        await message.answer("Профилирование уже запущено.")
+        return
+
+    task = asyncio.create_task(send_profile(message, done))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+    limit = f" или {updates} апдейтов" if updates else ""
+    await message.answer(f"🔬 Профилирование запущено на {seconds:.0f} с{limit}.")
+
+
 @router.message(F.text)
 async def handle_unknown(message: Message) -> None:
     """Handle unknown messages."""
@@ -565,15 +802,97 @@ async def handle_unknown(message: Message) -> None:
     )
 
 
+async def run_shard_worker(queue: Any) -> None:
+    """Handle updates from a shard queue in a worker process.
+
+    Args:
+        queue: Queue of raw updates filled by the front process
+    """
+
+    async def handle(data: dict) -> None:
+        if INVALIDATE_USER_SCRANS in data:
+            await invalidate_local_user_scrans(data[INVALIDATE_USER_SCRANS])
+            return
+        await dp.feed_raw_update(bot, data)
+
+    install_signal_handler()
+
+    # Workers only need the /top snapshot, reconciliation runs in the front process
+    top_task = asyncio.create_task(stats_reconciler.run(reconcile=False))
+    try:
+        await serve_shard(queue, handle, BOT_WORKER_CONCURRENCY)
+    finally:
+        top_task.cancel()
+        await bot.session.close()
+
+
+def shard_worker(index: int, queue: Any) -> None:
+    """Entry point of a shard worker process.
+
+    Args:
+        index: Worker index
+        queue: Queue of raw updates filled by the front process
+    """
+    # Ctrl+C reaches the whole process group, the front process drains workers instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    dp.include_router(router)
+    logger.info(f"Shard worker {index} started")
+    if FAST_RUNTIME:
+        install_event_loop_policy()
+    asyncio.run(run_shard_worker(queue))
+
+
+def shard_invalidator(pool: ShardPool) -> Callable[[str], Awaitable[None]]:
+    """Build a callback dropping cached /status pages in the worker serving a user.
+
+    Args:
+        pool: Pool of shard workers
+
+    Returns:
+        Coroutine function taking a Telegram user ID
+    """
+
+    async def invalidate(telegram_id: str) -> None:
+        await pool.dispatch(int(telegram_id), {INVALIDATE_USER_SCRANS: telegram_id})
+
+    return invalidate
+
+
 async def main() -> None:
     """Main entry point."""
     # Include router
     dp.include_router(router)
 
+    # Profile on SIGUSR1 as well as on /profile
+    install_signal_handler()
+
+    # Pre-generate daily rounds in the background
+    scheduler = DailyScheduler()
+    scheduler_task = asyncio.create_task(scheduler.run())
+    stats_task = asyncio.create_task(stats_reconciler.run())
+
+    pool = ShardPool(shard_worker, BOT_WORKERS, BOT_WORKER_QUEUE_SIZE) if BOT_WORKERS > 1 else None
+
+    # Push approvals to suggesters instead of making them poll /status
+    notifier = ApprovalNotifier(
+        bot, shard_invalidator(pool) if pool else invalidate_local_user_scrans
+    )
+    notifier_task = asyncio.create_task(notifier.run())
+
     # Start bot
-    logger.info("Starting bot...")
-    await dp.start_polling(bot)
+    logger.info(f"Starting bot ({'fast' if FAST_RUNTIME else 'default'} runtime)...")
+    try:
+        if pool:
+            await run_sharded_polling(bot, dp, pool)
+        else:
+            await dp.start_polling(bot)
+    finally:
+        scheduler_task.cancel()
+        stats_task.cancel()
+        notifier_task.cancel()
 
 
 if __name__ == "__main__":
+    if FAST_RUNTIME:
+        install_event_loop_policy()
     asyncio.run(main())
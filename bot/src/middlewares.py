@@ -0,0 +1,149 @@
+"""Middlewares that filter duplicate updates and feed the profiler."""
+
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramAPIError
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import CallbackQuery, TelegramObject, Update
+
+from cache import TTLCache
+from profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+
+class DeduplicateUpdatesMiddleware(BaseMiddleware):
+    """Drops updates whose update_id was already seen.
+
+    Register as an outer middleware on dp.update.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        maxsize: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize middleware.
+
+        Args:
+            ttl: Seconds to remember an update_id
+            maxsize: Maximum number of remembered update IDs
+            clock: Function returning the current time in seconds
+        """
+        self.seen = TTLCache(maxsize=maxsize, ttl=ttl, clock=clock)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if isinstance(event, Update):
+            if event.update_id in self.seen:
+                logger.debug(f"Dropped duplicate update {event.update_id}")
+                return None
+            self.seen.set(event.update_id, True)
+
+        return await handler(event, data)
+
+
+class VoteDebounceMiddleware(BaseMiddleware):
+    """Coalesces repeated vote callbacks from the same user.
+
+    Any vote:<scran_id>:<type> callback for a scran the user tapped within
+    the window is answered right away and never reaches process_vote. This
+    covers identical taps as well as a quick like-then-dislike, which
+    process_vote would reject anyway. Register as an outer middleware on
+    router.callback_query.
+    """
+
+    def __init__(
+        self,
+        window: float = 3.0,
+        maxsize: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize middleware.
+
+        Args:
+            window: Seconds during which repeated taps are dropped
+            maxsize: Maximum number of remembered (user, scran) pairs
+            clock: Function returning the current time in seconds
+        """
+        self.recent = TTLCache(maxsize=maxsize, ttl=window, clock=clock)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if (
+            isinstance(event, CallbackQuery)
+            and event.data
+            and event.data.startswith("vote:")
+            and event.from_user
+        ):
+            key = (event.from_user.id, event.data.split(":")[1])
+            if key in self.recent:
+                # Callback query might be too old
+                with contextlib.suppress(TelegramAPIError):
+                    await event.answer("Ты уже голосовал за это блюдо!")
+                return None
+            self.recent.set(key, True)
+
+        return await handler(event, data)
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """Times whole updates and counts them while profiling is enabled.
+
+    Register as an outer middleware on dp.update.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if not profiler.enabled:
+            return await handler(event, data)
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            name = event.event_type if isinstance(event, Update) else type(event).__name__
+            profiler.record("update", name, time.perf_counter() - started)
+            profiler.update_handled()
+
+
+class ProfilingRequestMiddleware(BaseRequestMiddleware):
+    """Times Telegram API calls while profiling is enabled.
+
+    Register with bot.session.middleware.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if not profiler.enabled:
+            return await make_request(bot, method)
+
+        with profiler.span("telegram", type(method).__name__):
+            return await make_request(bot, method)
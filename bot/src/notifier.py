@@ -0,0 +1,148 @@
+"""Batched notifications to suggesters when their scrans are approved."""
+
+import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramRetryAfter
+
+from database import Database, user_scrans_cache
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY channel of the scran_approved_notify trigger, payload is the scran ID
+APPROVAL_CHANNEL = "scran_approved"
+
+MAX_SEND_ATTEMPTS = 3
+
+# Keeps a notification well under Telegram's 4096 characters
+MAX_LISTED_SCRANS = 30
+
+# Key of the shard queue message telling a worker to drop a user's /status pages
+INVALIDATE_USER_SCRANS = "invalidate_user_scrans"
+
+
+async def invalidate_local_user_scrans(telegram_id: str) -> None:
+    """Drop cached /status pages of a user in this process."""
+    user_scrans_cache.pop(telegram_id)
+
+
+class ApprovalNotifier:
+    """Collects approved scran IDs and messages each suggester once per batch.
+
+    Approvals arrive through LISTEN/NOTIFY, so both the bot and the Next.js
+    admin panel trigger them.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        invalidate: Callable[[str], Awaitable[None]] = invalidate_local_user_scrans,
+    ):
+        """Initialize notifier settings from environment.
+
+        Args:
+            bot: Bot used to send notifications
+            invalidate: Coroutine function dropping cached /status pages of a
+                user, in whichever process serves that user's updates
+        """
+        self.bot = bot
+        self.invalidate = invalidate
+        self.batch_window = float(os.getenv("APPROVAL_BATCH_SECONDS", "60"))
+        self.messages_per_second = float(os.getenv("APPROVAL_MESSAGES_PER_SECOND", "20"))
+        if self.messages_per_second <= 0:
+            raise ValueError("APPROVAL_MESSAGES_PER_SECOND must be positive")
+        self.db = Database()
+        self.pending_ids: set[int] = set()
+
+    def on_notify(self, connection: object, pid: int, channel: str, payload: str) -> None:
+        """Queue a scran approved in the database."""
+        try:
+            self.pending_ids.add(int(payload))
+        except ValueError:
+            logger.warning(f"Invalid {channel} payload: {payload!r}")
+
+    async def send(self, telegram_id: str, text: str) -> bool:
+        """Send a message, waiting out Telegram flood limits.
+
+        Args:
+            telegram_id: Telegram user ID
+            text: Message text
+
+        Returns:
+            True if the message was sent
+        """
+        for _ in range(MAX_SEND_ATTEMPTS):
+            try:
+                await self.bot.send_message(int(telegram_id), text)
+                return True
+            except TelegramRetryAfter as e:
+                logger.warning(f"Flood limit hit, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+            except TelegramForbiddenError:
+                # User blocked the bot
+                return False
+            except TelegramAPIError as e:
+                logger.error(f"Error notifying user {telegram_id}: {e}")
+                return False
+        return False
+
+    async def flush(self) -> int:
+        """Notify suggesters of all scrans approved since the last flush.
+
+        Returns:
+            Number of sent messages
+        """
+        if not self.pending_ids:
+            return 0
+
+        scran_ids, self.pending_ids = sorted(self.pending_ids), set()
+        try:
+            scrans = await self.db.get_scrans_by_ids(scran_ids)
+        except Exception:
+            # Keep the batch for the next flush
+            self.pending_ids.update(scran_ids)
+            raise
+
+        approved_by_user: dict[str, list[str]] = {}
+        for scran in scrans:
+            if scran["approved"] and scran["telegram_id"]:
+                approved_by_user.setdefault(scran["telegram_id"], []).append(scran["name"])
+
+        sent = 0
+        for telegram_id, names in approved_by_user.items():
+            # /status pages of this user are stale now
+            await self.invalidate(telegram_id)
+
+            text = "🎉 Твои блюда одобрены и скоро попадут в дейлик:\n\n"
+            text += "".join(f"• {name}\n" for name in names[:MAX_LISTED_SCRANS])
+            if len(names) > MAX_LISTED_SCRANS:
+                text += f"…и ещё {len(names) - MAX_LISTED_SCRANS}\n"
+            if await self.send(telegram_id, text):
+                sent += 1
+            await asyncio.sleep(1 / self.messages_per_second)
+
+        logger.info(f"Sent {sent} approval notifications for {len(scrans)} scrans")
+        return sent
+
+    async def run(self) -> None:
+        """Listen for approvals and flush them every batch window, forever."""
+        logger.info(f"Approval notifier started: batches every {self.batch_window}s")
+        try:
+            while True:
+                try:
+                    # Connect here so a database that is not up yet is retried next window
+                    if not self.db.pool:
+                        await self.db.connect()
+                    connection = self.db.listen_connection
+                    if connection is None or connection.is_closed():
+                        await self.db.listen(APPROVAL_CHANNEL, self.on_notify)
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Error sending approval notifications: {e}")
+
+                await asyncio.sleep(self.batch_window)
+        finally:
+            await self.db.close()
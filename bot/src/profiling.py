@@ -0,0 +1,236 @@
+"""On-demand sampling profiler for live update handling.
+
+While enabled, a background thread samples the event loop thread's stack
+into folded stacks (flamegraph.pl / speedscope format) and the bot records
+per-await timings of database queries, Telegram API calls and file I/O.
+When disabled, every hook returns after a single flag check.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from types import FrameType, TracebackType
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "/app/profiles"))
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))
+MAX_PROFILE_SECONDS = 600.0
+
+
+def fold_stack(frame: FrameType | None) -> str:
+    """Fold a frame and its callers into a "root;...;leaf" line."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Span:
+    """Context manager timing a block when profiling is enabled."""
+
+    __slots__ = ("profiler", "category", "name", "started")
+
+    def __init__(self, profiler: "Profiler", category: str, name: str):
+        self.profiler = profiler
+        self.category = category
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self) -> None:
+        if self.profiler.enabled:
+            self.started = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if self.started:
+            self.profiler.record(self.category, self.name, time.perf_counter() - self.started)
+
+
+class Profiler:
+    """Samples the event loop thread and collects await timings for a while."""
+
+    def __init__(self, output_dir: Path = PROFILE_DIR, interval: float = 0.005):
+        """Initialize profiler.
+
+        Args:
+            output_dir: Directory for profile files
+            interval: Seconds between stack samples
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self.enabled = False
+        self.stacks: Counter[str] = Counter()
+        self.timings: defaultdict[str, list[float]] = defaultdict(list)
+        self.updates_left = 0
+        self.started_at = 0.0
+        self.target_thread_id = 0
+        self.sampler: threading.Thread | None = None
+        self.timer: asyncio.TimerHandle | None = None
+        self.done: asyncio.Future[list[Path]] | None = None
+
+    def start(
+        self, seconds: float = PROFILE_SECONDS, updates: int = 0
+    ) -> asyncio.Future[list[Path]]:
+        """Start profiling the running event loop.
+
+        Args:
+            seconds: Stop after this many seconds
+            updates: Stop after this many handled updates, 0 for no limit
+
+        Returns:
+            Future resolved with written file paths when profiling stops
+        """
+        if self.enabled:
+            raise RuntimeError("Profiling is already running")
+
+        loop = asyncio.get_running_loop()
+        self.stacks = Counter()
+        self.timings = defaultdict(list)
+        self.updates_left = updates
+        self.started_at = time.perf_counter()
+        self.target_thread_id = threading.get_ident()
+        self.done = loop.create_future()
+        self.enabled = True
+
+        self.sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self.sampler.start()
+        self.timer = loop.call_later(min(seconds, MAX_PROFILE_SECONDS), self.stop)
+        logger.info(f"Profiling started for {seconds}s / {updates or 'unlimited'} updates")
+        return self.done
+
+    def stop(self) -> None:
+        """Stop profiling and write results."""
+        if not self.enabled:
+            return
+
+        self.enabled = False
+        if self.timer:
+            self.timer.cancel()
+        if self.sampler:
+            self.sampler.join()
+
+        try:
+            paths = self._write()
+        except OSError as e:
+            logger.error(f"Error writing profile: {e}")
+            if self.done and not self.done.done():
+                self.done.set_exception(e)
+            return
+
+        logger.info(f"Profile written to {paths[0].parent}")
+        if self.done and not self.done.done():
+            self.done.set_result(paths)
+
+    def record(self, category: str, name: str, seconds: float) -> None:
+        """Record the duration of an await.
+
+        Args:
+            category: Kind of await, e.g. "db", "telegram", "file", "update"
+            name: Operation name within the category
+            seconds: Duration
+        """
+        if self.enabled:
+            self.timings[f"{category}:{name}"].append(seconds)
+
+    def span(self, category: str, name: str) -> Span:
+        """Time a block as an await of the given category."""
+        return Span(self, category, name)
+
+    def update_handled(self) -> None:
+        """Count a handled update, stopping after the requested number."""
+        if self.enabled and self.updates_left:
+            self.updates_left -= 1
+            if not self.updates_left:
+                self.stop()
+
+    def log_query(self, query: Any) -> None:
+        """asyncpg query logger recording query durations."""
+        if self.enabled:
+            name = " ".join(query.query.split())[:80]
+            self.record("db", name, query.elapsed)
+
+    def summary(self, limit: int = 10) -> list[dict]:
+        """Get await timings sorted by total time.
+
+        Args:
+            limit: Maximum number of entries, 0 for all
+
+        Returns:
+            List of timing dictionaries in milliseconds
+        """
+        entries = []
+        for key, durations in self.timings.items():
+            durations = sorted(durations)
+            entries.append(
+                {
+                    "await": key,
+                    "count": len(durations),
+                    "total_ms": round(sum(durations) * 1000, 3),
+                    "mean_ms": round(sum(durations) / len(durations) * 1000, 3),
+                    "p95_ms": round(durations[int(len(durations) * 0.95)] * 1000, 3),
+                    "max_ms": round(durations[-1] * 1000, 3),
+                }
+            )
+        entries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return entries[:limit] if limit else entries
+
+    def _sample(self) -> None:
+        while self.enabled:
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is not None:
+                self.stacks[fold_stack(frame)] += 1
+            del frame
+            time.sleep(self.interval)
+
+    def _write(self) -> list[Path]:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+
+        stacks_path = self.output_dir / f"profile-{stamp}.folded"
+        lines = (f"{stack} {count}\n" for stack, count in self.stacks.items())
+        stacks_path.write_text("".join(lines))
+
+        timings_path = self.output_dir / f"profile-{stamp}-awaits.json"
+        report = {
+            "duration_s": round(time.perf_counter() - self.started_at, 3),
+            "samples": sum(self.stacks.values()),
+            "sample_interval_ms": self.interval * 1000,
+            "awaits": self.summary(limit=0),
+        }
+        timings_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+        return [stacks_path, timings_path]
+
+
+# Process-wide profiler used by the bot's hooks
+profiler = Profiler()
+
+
+def install_signal_handler() -> None:
+    """Start profiling for PROFILE_SECONDS on SIGUSR1."""
+
+    def on_signal() -> None:
+        try:
+            profiler.start()
+        except RuntimeError as e:
+            logger.warning(str(e))
+
+    # No SIGUSR1 or loop signal handlers on this platform
+    with contextlib.suppress(NotImplementedError, AttributeError):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, on_signal)
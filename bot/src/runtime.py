@@ -0,0 +1,68 @@
+"""Optional high-performance runtime: uvloop event loop and orjson serialization.
+
+Both libraries are optional (the "fast" extra). When BOT_FAST_RUNTIME is
+enabled but a library is missing, the stdlib implementation is used instead.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections.abc import Callable
+from typing import Any
+
+from aiogram.client.session.aiohttp import AiohttpSession
+
+logger = logging.getLogger(__name__)
+
+FAST_RUNTIME = os.getenv("BOT_FAST_RUNTIME", "").lower() in ("1", "true", "yes")
+
+
+def install_event_loop_policy() -> bool:
+    """Use uvloop for new event loops if it is installed.
+
+    Returns:
+        True if uvloop was installed
+    """
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("uvloop is not installed, using the default asyncio event loop")
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def get_json_functions() -> tuple[Callable[..., Any], Callable[..., str]]:
+    """Get orjson loads/dumps if installed, stdlib json otherwise.
+
+    Returns:
+        Tuple of (json_loads, json_dumps); json_dumps returns str as aiogram expects
+    """
+    try:
+        import orjson
+    except ImportError:
+        logger.warning("orjson is not installed, using stdlib json")
+        return json.loads, json.dumps
+
+    def orjson_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    return orjson.loads, orjson_dumps
+
+
+def create_session(fast: bool = FAST_RUNTIME) -> AiohttpSession:
+    """Create the aiogram HTTP session.
+
+    Args:
+        fast: Use orjson for request and response serialization
+
+    Returns:
+        Aiohttp session for the Bot
+    """
+    if not fast:
+        return AiohttpSession()
+
+    json_loads, json_dumps = get_json_functions()
+    return AiohttpSession(json_loads=json_loads, json_dumps=json_dumps)
@@ -0,0 +1,176 @@
+"""Scheduler that pre-generates daily scrandle rounds ahead of time."""
+
+import asyncio
+import logging
+import os
+import random
+from datetime import UTC, date, datetime, timedelta
+
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+# Same limits as the Next.js cron route (next/app/api/cron/daily/route.ts)
+ROUNDS_COUNT = 10
+MIN_VOTES = 3
+REPEAT_WINDOW_DAYS = 50
+
+
+def get_likes_percentage(scran: dict) -> float:
+    """Calculate the percentage of likes for a scran.
+
+    Args:
+        scran: Scran dictionary with number_of_likes and number_of_dislikes
+
+    Returns:
+        Likes percentage, 50 if the scran has no votes
+    """
+    total = scran["number_of_likes"] + scran["number_of_dislikes"]
+    if total == 0:
+        return 50.0
+    return scran["number_of_likes"] / total * 100
+
+
+def get_pair_weight(scran_a: dict, scran_b: dict) -> float:
+    """Weight a pair by how uncertain the scores of its scrans are.
+
+    Scrans with fewer votes have noisier likes percentages, so rounds with
+    them tell more about which one players prefer.
+
+    Args:
+        scran_a: Scran dictionary with vote counts
+        scran_b: Scran dictionary with vote counts
+
+    Returns:
+        Positive weight, higher for less voted scrans
+    """
+    return sum(
+        1 / max(scran["number_of_likes"] + scran["number_of_dislikes"], 1) ** 0.5
+        for scran in (scran_a, scran_b)
+    )
+
+
+def build_daily_pairs(
+    candidates: list[dict],
+    exclude_ids: set[int] | None = None,
+    rounds: int = ROUNDS_COUNT,
+) -> list[tuple[int, int]]:
+    """Build balanced pairs for one day of rounds.
+
+    The whole pool is sorted by likes percentage and random neighbours are
+    paired, so every round compares scrans with close scores. Neighbour
+    pairs of less voted scrans are picked more often. Round order is
+    shuffled afterwards to mix easy and hard rounds.
+
+    Args:
+        candidates: Scran dictionaries with vote counts
+        exclude_ids: Scran IDs that must not be used
+        rounds: Number of rounds to build
+
+    Returns:
+        List of (scran_a_id, scran_b_id) tuples, empty if there are too few candidates
+    """
+    exclude_ids = exclude_ids or set()
+    pool = sorted(
+        (scran for scran in candidates if scran["id"] not in exclude_ids),
+        key=get_likes_percentage,
+    )
+    if len(pool) < rounds * 2:
+        return []
+
+    # Weighted random order of neighbour pairs (Efraimidis-Spirakis keys)
+    neighbours = sorted(
+        range(len(pool) - 1),
+        key=lambda i: random.random() ** (1 / get_pair_weight(pool[i], pool[i + 1])),
+        reverse=True,
+    )
+    used: set[int] = set()
+    selected = []
+    for i in neighbours:
+        if len(selected) == rounds:
+            break
+        if i not in used and i + 1 not in used:
+            used.update((i, i + 1))
+            selected.append((pool[i], pool[i + 1]))
+
+    # Small pools can run out of free neighbours, pair what is left in order
+    rest = [scran for i, scran in enumerate(pool) if i not in used]
+    while len(selected) < rounds:
+        selected.append((rest.pop(0), rest.pop(0)))
+
+    pairs = []
+    for scran_a, scran_b in selected:
+        if random.random() < 0.5:
+            scran_a, scran_b = scran_b, scran_a
+        pairs.append((scran_a["id"], scran_b["id"]))
+
+    random.shuffle(pairs)
+    return pairs
+
+
+class DailyScheduler:
+    """Periodically fills daily_scrandles for the upcoming days."""
+
+    def __init__(self):
+        """Initialize scheduler settings from environment."""
+        self.days_ahead = int(os.getenv("DAILY_DAYS_AHEAD", "3"))
+        self.interval = int(os.getenv("DAILY_SCHEDULER_INTERVAL", "3600"))
+        self.db = Database()
+
+    async def generate_ahead(self, today: date | None = None) -> list[str]:
+        """Generate rounds for today and the next days_ahead days.
+
+        Args:
+            today: Date to start from, defaults to the current UTC date
+
+        Returns:
+            List of dates (YYYY-MM-DD) that received new rounds
+        """
+        today = today or datetime.now(UTC).date()
+        dates = [(today + timedelta(days=i)).isoformat() for i in range(self.days_ahead + 1)]
+        window_start = (today - timedelta(days=REPEAT_WINDOW_DAYS)).isoformat()
+
+        await self.db.connect()
+        try:
+            scheduled = await self.db.get_scheduled_dates(dates[0])
+            missing = [d for d in dates if d not in scheduled]
+            if not missing:
+                return []
+
+            candidates = await self.db.get_daily_candidates(MIN_VOTES)
+            used_ids = await self.db.get_recent_daily_scran_ids(window_start)
+
+            generated = []
+            for day in missing:
+                pairs = build_daily_pairs(candidates, used_ids) or build_daily_pairs(candidates)
+                if not pairs:
+                    logger.warning(
+                        f"Not enough scrans with sufficient votes for {day} "
+                        f"(need at least {ROUNDS_COUNT * 2}, found {len(candidates)})"
+                    )
+                    break
+
+                if await self.db.insert_daily_rounds(day, pairs):
+                    generated.append(day)
+                for scran_a_id, scran_b_id in pairs:
+                    used_ids.add(scran_a_id)
+                    used_ids.add(scran_b_id)
+
+            return generated
+        finally:
+            await self.db.close()
+
+    async def run(self) -> None:
+        """Run the scheduler loop forever."""
+        logger.info(
+            f"Daily scheduler started: {self.days_ahead} days ahead, every {self.interval}s"
+        )
+        while True:
+            try:
+                generated = await self.generate_ahead()
+                if generated:
+                    logger.info(f"Generated daily rounds for: {', '.join(generated)}")
+            except Exception as e:
+                logger.error(f"Error generating daily rounds: {e}")
+
+            await asyncio.sleep(self.interval)
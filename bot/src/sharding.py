@@ -0,0 +1,290 @@
+"""Multi-process update processing sharded by Telegram user.
+
+A front process polls Telegram and dispatches raw updates to worker
+processes by hashing the sender's user ID, so updates of one user are
+always handled by the same worker, in order, with a consistent FSM.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import queue as queue_module
+import signal
+from collections.abc import Awaitable, Callable
+from functools import partial
+from multiprocessing.process import BaseProcess
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
+
+logger = logging.getLogger(__name__)
+
+# Workers start from a clean interpreter instead of forking a running event loop
+mp_context = multiprocessing.get_context("spawn")
+
+# Signals that make the front process drain workers and exit
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+def get_update_key(update: dict) -> int:
+    """Get the sharding key of a raw update.
+
+    Args:
+        update: Raw update dictionary as returned by the Bot API
+
+    Returns:
+        Sender's user ID, or update_id for updates without a sender
+    """
+    for value in update.values():
+        if isinstance(value, dict):
+            sender = value.get("from") or value.get("user")
+            if isinstance(sender, dict) and "id" in sender:
+                return sender["id"]
+    return update.get("update_id", 0)
+
+
+async def serve_shard(
+    queue: Any,
+    handler: Callable[[dict], Awaitable[None]],
+    concurrency: int = 32,
+) -> None:
+    """Process updates from a shard queue until a None sentinel arrives.
+
+    Updates with different keys run concurrently (up to concurrency),
+    updates with the same key run strictly in arrival order. The queue
+    is only read when a slot is free, so a busy worker leaves items in
+    its bounded queue and the front process blocks on it.
+
+    Args:
+        queue: Multiprocessing queue of (key, update) tuples
+        handler: Coroutine function processing one raw update
+        concurrency: Maximum number of updates in flight
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    tails: dict[int, asyncio.Task] = {}
+
+    async def process(key: int, data: dict, previous: asyncio.Task | None) -> None:
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            await handler(data)
+        except Exception as e:
+            logger.error(f"Error processing update {data.get('update_id')}: {e}")
+        finally:
+            semaphore.release()
+            if tails.get(key) is asyncio.current_task():
+                del tails[key]
+
+    while True:
+        await semaphore.acquire()
+        item = await loop.run_in_executor(None, queue.get)
+        if item is None:
+            semaphore.release()
+            break
+
+        key, data = item
+        tails[key] = asyncio.create_task(process(key, data, tails.get(key)))
+
+    if tails:
+        await asyncio.wait(list(tails.values()))
+
+
+class ShardPool:
+    """Pool of worker processes, each fed by its own bounded queue."""
+
+    def __init__(
+        self,
+        target: Callable[..., None],
+        workers: int,
+        queue_size: int = 100,
+        args: tuple = (),
+    ):
+        """Initialize pool.
+
+        Args:
+            target: Picklable worker entry point called as target(index, queue, *args)
+            workers: Number of worker processes
+            queue_size: Maximum number of queued updates per worker
+            args: Extra arguments passed to target
+        """
+        self.target = target
+        self.workers = workers
+        self.queue_size = queue_size
+        self.args = args
+        self.queues = [mp_context.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.processes: list[BaseProcess | None] = [None] * workers
+        self.stopping = False
+
+    def _spawn(self, index: int) -> None:
+        process = mp_context.Process(
+            target=self.target,
+            args=(index, self.queues[index], *self.args),
+            name=f"shard-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self) -> None:
+        """Start all worker processes."""
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info(f"Started {self.workers} shard workers")
+
+    async def dispatch(self, key: int, data: dict) -> None:
+        """Queue an update on the worker owning key.
+
+        Blocks (without blocking the event loop) while the worker's queue
+        is full, which is what throttles the front process.
+
+        Args:
+            key: Sharding key, see get_update_key
+            data: Raw update dictionary
+        """
+        index = key % self.workers
+        loop = asyncio.get_running_loop()
+        while True:
+            # Re-read the queue on every attempt, it is replaced when the worker restarts
+            put = partial(self.queues[index].put, (key, data), timeout=1.0)
+            try:
+                await loop.run_in_executor(None, put)
+                return
+            except queue_module.Full:
+                continue
+
+    def restart(self, index: int) -> None:
+        """Restart a dead worker with a fresh queue.
+
+        A worker killed while waiting in queue.get() never releases the
+        queue's read lock, so its replacement could never read from it.
+        Updates still queued for the dead worker are dropped and logged.
+
+        Args:
+            index: Worker index
+        """
+        old_queue = self.queues[index]
+        self.queues[index] = mp_context.Queue(maxsize=self.queue_size)
+        try:
+            lost = old_queue.qsize()
+        except NotImplementedError:
+            # sem_getvalue() is missing on macOS
+            logger.warning(f"Shard worker {index} restarted, its queued updates were lost")
+        else:
+            if lost:
+                logger.warning(f"Shard worker {index} restarted, lost {lost} queued updates")
+        old_queue.cancel_join_thread()
+        old_queue.close()
+        self._spawn(index)
+
+    async def supervise(self, interval: float = 5.0) -> None:
+        """Restart workers that died, forever.
+
+        Args:
+            interval: Seconds between health checks
+        """
+        while not self.stopping:
+            await asyncio.sleep(interval)
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive() and not self.stopping:
+                    logger.error(
+                        f"Shard worker {index} exited with code {process.exitcode}, restarting"
+                    )
+                    self.restart(index)
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Drain queues and stop all workers.
+
+        Args:
+            timeout: Seconds to wait for each worker before terminating it
+        """
+        self.stopping = True
+        loop = asyncio.get_running_loop()
+        for index, process in enumerate(self.processes):
+            if process is not None and process.is_alive():
+                put = partial(self.queues[index].put, None, timeout=timeout)
+                try:
+                    await loop.run_in_executor(None, put)
+                except queue_module.Full:
+                    logger.warning(f"Shard worker {index} queue is full, it will be terminated")
+
+        for process in self.processes:
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"Shard worker {process.name} did not stop, terminating")
+                process.terminate()
+
+        logger.info("Shard workers stopped")
+
+
+async def run_sharded_polling(
+    bot: "Bot",
+    dispatcher: "Dispatcher",
+    pool: ShardPool,
+    polling_timeout: int = 30,
+) -> None:
+    """Poll Telegram in this process and hand updates to the shard pool.
+
+    SIGTERM and SIGINT stop polling and drain the worker queues, since
+    queued updates are already confirmed to Telegram.
+
+    Args:
+        bot: Bot used for getUpdates
+        dispatcher: Dispatcher used to resolve allowed update types
+        pool: Shard pool whose workers feed updates to their own dispatcher
+        polling_timeout: Long polling timeout in seconds
+    """
+    allowed_updates = dispatcher.resolve_used_update_types()
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in STOP_SIGNALS:
+        loop.add_signal_handler(signum, stop.set)
+
+    pool.start()
+    supervisor = asyncio.create_task(pool.supervise())
+    offset = None
+
+    try:
+        while not stop.is_set():
+            polling = asyncio.ensure_future(
+                bot.get_updates(
+                    offset=offset,
+                    timeout=polling_timeout,
+                    allowed_updates=allowed_updates,
+                )
+            )
+            stopped = asyncio.ensure_future(stop.wait())
+            await asyncio.wait([polling, stopped], return_when=asyncio.FIRST_COMPLETED)
+            stopped.cancel()
+            if not polling.done():
+                polling.cancel()
+                break
+
+            try:
+                updates = polling.result()
+            except Exception as e:
+                logger.error(f"Error getting updates: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for update in updates:
+                data = update.model_dump(mode="json", by_alias=True, exclude_none=True)
+                await pool.dispatch(get_update_key(data), data)
+                offset = update.update_id + 1
+
+        logger.info("Stopping sharded polling")
+    finally:
+        for signum in STOP_SIGNALS:
+            loop.remove_signal_handler(signum)
+        supervisor.cancel()
+        await pool.stop()
+
+    # Confirm the last batch, so it is not delivered again after a restart
+    if offset is not None:
+        try:
+            await bot.get_updates(offset=offset, timeout=0, limit=1)
+        except Exception as e:
+            logger.warning(f"Error confirming last updates: {e}")
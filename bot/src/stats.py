@@ -0,0 +1,67 @@
+"""Periodic reconciliation of user stats and the top scrans snapshot."""
+
+import asyncio
+import logging
+import os
+
+from database import Database
+from scheduler import MIN_VOTES
+
+logger = logging.getLogger(__name__)
+
+TOP_SCRANS_COUNT = 10
+
+
+class StatsReconciler:
+    """Corrects telegram_user_stats drift and keeps top scrans in memory.
+
+    telegram_user_stats is updated incrementally by Database on every vote
+    and suggestion, and by a trigger on every approval or ban. Anything
+    else that changes the raw tables is picked up here.
+    """
+
+    def __init__(self):
+        """Initialize reconciler settings from environment."""
+        self.interval = int(os.getenv("STATS_RECONCILE_INTERVAL", "600"))
+        self.db = Database()
+        self.top_scrans: list[dict] = []
+
+    async def reconcile(self) -> int:
+        """Reconcile user stats and refresh the top scrans snapshot.
+
+        Returns:
+            Number of corrected user stats rows
+        """
+        await self.db.connect()
+        try:
+            corrected = await self.db.reconcile_user_stats()
+            self.top_scrans = await self.db.get_top_scrans(TOP_SCRANS_COUNT, MIN_VOTES)
+        finally:
+            await self.db.close()
+        return corrected
+
+    async def refresh_top(self) -> None:
+        """Refresh the top scrans snapshot without reconciling user stats."""
+        await self.db.connect()
+        try:
+            self.top_scrans = await self.db.get_top_scrans(TOP_SCRANS_COUNT, MIN_VOTES)
+        finally:
+            await self.db.close()
+
+    async def run(self, reconcile: bool = True) -> None:
+        """Run the reconcile loop forever.
+
+        Args:
+            reconcile: Reconcile user stats too, not only refresh top scrans
+        """
+        logger.info(f"Stats reconciler started: every {self.interval}s")
+        while True:
+            try:
+                if reconcile:
+                    await self.reconcile()
+                else:
+                    await self.refresh_top()
+            except Exception as e:
+                logger.error(f"Error reconciling stats: {e}")
+
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,41 @@
+"""Tests of vote card rendering and caching."""
+
+from cards import VoteCardCache, render_vote_card
+
+
+def make_scran(**fields: object) -> dict:
+    scran = {"id": 42, "name": "Borscht", "description": None, "price": 350}
+    scran.update(fields)
+    return scran
+
+
+def test_user_text_is_escaped() -> None:
+    card = render_vote_card(
+        make_scran(name="*Fish* & <b>chips</b>", description="_salt_ & <i>vinegar</i>")
+    )
+
+    assert card.caption == (
+        "<b>*Fish* &amp; &lt;b&gt;chips&lt;/b&gt;</b>\n\n"
+        "_salt_ &amp; &lt;i&gt;vinegar&lt;/i&gt;\n\n"
+        "💰 350.00 ₽"
+    )
+
+
+def test_buttons_vote_for_the_scran() -> None:
+    card = render_vote_card(make_scran())
+
+    assert card.caption == "<b>Borscht</b>\n\n💰 350.00 ₽"
+    [buttons] = card.reply_markup.inline_keyboard
+    assert [button.callback_data for button in buttons] == ["vote:42:like", "vote:42:dislike"]
+
+
+def test_edited_scran_is_rendered_again() -> None:
+    cache = VoteCardCache()
+    scran = make_scran()
+
+    card = cache.get(scran)
+    assert cache.get(dict(scran)) is card
+
+    edited = cache.get(make_scran(name="Borscht & smetana"))
+    assert edited is not card
+    assert edited.caption.startswith("<b>Borscht &amp; smetana</b>")
@@ -0,0 +1,100 @@
+"""Tests of duplicate update filtering and vote debouncing."""
+
+import asyncio
+from collections.abc import Iterator
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiogram.types import CallbackQuery, Update, User
+
+from middlewares import DeduplicateUpdatesMiddleware, VoteDebounceMiddleware
+
+
+class FakeClock:
+    """Clock for TTL caches that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def answer() -> Iterator[AsyncMock]:
+    with patch.object(CallbackQuery, "answer", new_callable=AsyncMock) as mock:
+        yield mock
+
+
+def make_vote(user_id: int, data: str) -> CallbackQuery:
+    return CallbackQuery(
+        id=f"{user_id}:{data}",
+        from_user=User(id=user_id, is_bot=False, first_name="Test"),
+        chat_instance="chat",
+        data=data,
+    )
+
+
+def run(middleware: Any, event: Any) -> bool:
+    """Pass an event through a middleware and tell whether the handler ran."""
+    handler = AsyncMock(return_value="handled")
+    result = asyncio.run(middleware(handler, event, {}))
+    assert result == ("handled" if handler.called else None)
+    return handler.called
+
+
+def test_duplicate_update_is_dropped(clock: FakeClock) -> None:
+    middleware = DeduplicateUpdatesMiddleware(clock=clock)
+
+    assert run(middleware, Update(update_id=1))
+    assert not run(middleware, Update(update_id=1))
+    assert run(middleware, Update(update_id=2))
+
+
+def test_repeated_vote_tap_is_answered_without_handler(clock: FakeClock, answer: AsyncMock) -> None:
+    middleware = VoteDebounceMiddleware(window=3.0, clock=clock)
+
+    assert run(middleware, make_vote(1, "vote:10:like"))
+    clock.now += 1.0
+    # Same scran, whether the same or the opposite button
+    assert not run(middleware, make_vote(1, "vote:10:like"))
+    assert not run(middleware, make_vote(1, "vote:10:dislike"))
+    assert answer.await_count == 2
+
+    # Other users and other scrans are not affected
+    assert run(middleware, make_vote(2, "vote:10:like"))
+    assert run(middleware, make_vote(1, "vote:11:like"))
+
+
+def test_vote_tap_after_window_goes_through(clock: FakeClock, answer: AsyncMock) -> None:
+    middleware = VoteDebounceMiddleware(window=3.0, clock=clock)
+
+    assert run(middleware, make_vote(1, "vote:10:like"))
+    clock.now += 3.0
+    assert run(middleware, make_vote(1, "vote:10:like"))
+    answer.assert_not_awaited()
+
+
+def test_non_vote_callbacks_pass_through(clock: FakeClock, answer: AsyncMock) -> None:
+    middleware = VoteDebounceMiddleware(clock=clock)
+
+    assert run(middleware, make_vote(1, "status:older:5"))
+    assert run(middleware, make_vote(1, "status:older:5"))
+
+
+def test_remembered_taps_are_bounded(clock: FakeClock, answer: AsyncMock) -> None:
+    middleware = VoteDebounceMiddleware(window=60.0, maxsize=2, clock=clock)
+
+    for scran_id in (1, 2, 3):
+        assert run(middleware, make_vote(1, f"vote:{scran_id}:like"))
+    assert len(middleware.recent) == 2
+
+    # The oldest pair was evicted, the newest ones are still debounced
+    assert run(middleware, make_vote(1, "vote:1:like"))
+    assert not run(middleware, make_vote(1, "vote:3:like"))
@@ -0,0 +1,254 @@
+"""EXPLAIN checks of the bot's hot queries against a seeded local PostgreSQL.
+
+Connection settings come from the same POSTGRES_* variables as the bot. The
+tests create, seed and drop their own database, and are skipped when
+PostgreSQL is not reachable.
+"""
+
+import asyncio
+import json
+import os
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+import asyncpg
+import pytest
+
+from database import Database, user_scrans_cache
+
+PLAN_TEST_DB = "bebendle_query_plans"
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "next" / "db" / "migrations"
+
+# Tables that grow with usage and must never be scanned by hot queries
+LARGE_TABLES = {"scrans", "telegram_votes", "daily_scrandles", "telegram_user_stats"}
+
+SEED_SQL = """
+INSERT INTO scrans (
+    image_url, name, price, number_of_likes, number_of_dislikes, approved, telegram_id
+)
+SELECT '/uploads/' || i || '.jpg', 'Scran ' || i, (i % 1000)::real,
+       (i * 7) % 50, (i * 13) % 50, i % 20 = 0, (i % 5000)::text
+FROM generate_series(1, 100000) AS i;
+
+INSERT INTO telegram_votes (telegram_id, scran_id, is_like, created_at)
+SELECT (i % 4999)::text, i % 100000 + 1, i % 3 = 0, NOW()
+FROM generate_series(1, 200000) AS i;
+
+INSERT INTO daily_scrandles (date, scran_a_id, scran_b_id, round_number, created_at)
+SELECT to_char(DATE '2020-01-01' + day, 'YYYY-MM-DD'), day * 20 + round, day * 20 + round + 10,
+       round, NOW()
+FROM generate_series(0, 3649) AS day, generate_series(1, 10) AS round;
+"""
+
+# Database method name, args and kwargs of every hot query
+HOT_QUERIES = [
+    ("get_user_scrans", ("42",), {}),
+    ("get_user_scrans", ("42",), {"before_id": 50000}),
+    ("get_user_scrans", ("42",), {"after_id": 50000}),
+    ("get_scran_by_id", (123,), {}),
+    ("get_scrans_by_ids", ([1, 2, 3],), {}),
+    ("get_voted_scran_ids", ("42",), {}),
+    ("get_least_voted_scrans", (), {"limit": 50}),
+    ("get_daily_candidates", (3,), {}),
+    ("get_top_scrans", (), {}),
+    ("get_user_stats", ("42",), {}),
+    ("get_scheduled_dates", ("2029-01-01",), {}),
+    ("get_recent_daily_scran_ids", ("2029-06-01",), {}),
+]
+
+
+def connect_kwargs(database: str) -> dict[str, Any]:
+    """Get asyncpg connection arguments from environment."""
+    return {
+        "host": os.getenv("POSTGRES_HOST", "localhost"),
+        "port": int(os.getenv("POSTGRES_PORT", "5432")),
+        "user": os.getenv("POSTGRES_USER", "postgres"),
+        "password": os.getenv("POSTGRES_PASSWORD", "postgres"),
+        "database": database,
+    }
+
+
+class ExplainConnection:
+    """Connection stand-in that records query plans instead of running queries.
+
+    With generic=True the plan is the parameter-independent one Postgres
+    switches to for prepared statements after a few executions.
+    """
+
+    def __init__(self, connection: asyncpg.Connection, plans: list[dict], generic: bool):
+        self.connection = connection
+        self.plans = plans
+        self.generic = generic
+
+    async def _explain(self, query: str, *args: Any) -> None:
+        if self.generic:
+            plan = await self._explain_generic(query)
+        else:
+            plan = await self.connection.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *args)
+        self.plans.append(json.loads(plan)[0]["Plan"])
+
+    async def _explain_generic(self, query: str) -> str:
+        await self.connection.execute("SET plan_cache_mode = force_generic_plan")
+        await self.connection.execute(f"PREPARE explained AS {query}")
+        try:
+            param_count = await self.connection.fetchval(
+                """
+                SELECT cardinality(parameter_types)
+                FROM pg_prepared_statements WHERE name = 'explained'
+                """
+            )
+            # Values do not affect a generic plan
+            nulls = ", ".join(["NULL"] * param_count)
+            execute = f"EXECUTE explained({nulls})" if param_count else "EXECUTE explained"
+            return await self.connection.fetchval(f"EXPLAIN (FORMAT JSON) {execute}")
+        finally:
+            await self.connection.execute("DEALLOCATE explained")
+            await self.connection.execute("RESET plan_cache_mode")
+
+    async def fetch(self, query: str, *args: Any) -> list:
+        await self._explain(query, *args)
+        return []
+
+    async def fetchrow(self, query: str, *args: Any) -> None:
+        await self._explain(query, *args)
+
+    async def fetchval(self, query: str, *args: Any) -> None:
+        await self._explain(query, *args)
+
+
+class ExplainPool:
+    """Pool stand-in handing out ExplainConnection wrappers."""
+
+    def __init__(self, pool: asyncpg.Pool, generic: bool = False):
+        self.pool = pool
+        self.generic = generic
+        self.plans: list[dict] = []
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[ExplainConnection]:
+        async with self.pool.acquire() as connection:
+            yield ExplainConnection(connection, self.plans, self.generic)
+
+
+def find_index_conds(plan: dict, index: str) -> list[str]:
+    """Get conditions of scans over an index anywhere in a plan tree."""
+    conds = []
+    if plan.get("Index Name") == index and "Index Cond" in plan:
+        conds.append(plan["Index Cond"])
+    for child in plan.get("Plans", []):
+        conds.extend(find_index_conds(child, index))
+    return conds
+
+
+def find_seq_scans(plan: dict) -> list[str]:
+    """Get relations scanned sequentially anywhere in a plan tree."""
+    scans = []
+    if plan["Node Type"] == "Seq Scan":
+        scans.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        scans.extend(find_seq_scans(child))
+    return scans
+
+
+async def apply_migrations(connection: asyncpg.Connection) -> None:
+    """Apply SQL migrations statement by statement, outside transactions."""
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        for statement in path.read_text().split("--> statement-breakpoint"):
+            await connection.execute(statement)
+
+
+@pytest.fixture(scope="module")
+def runner() -> Iterator[asyncio.Runner]:
+    with asyncio.Runner() as runner:
+        yield runner
+
+
+@pytest.fixture(scope="module")
+def database(runner: asyncio.Runner) -> Iterator[Database]:
+    admin_db = os.getenv("POSTGRES_DB", "postgres")
+    try:
+        admin = runner.run(asyncpg.connect(**connect_kwargs(admin_db), timeout=5))
+    except (OSError, asyncpg.PostgresError, TimeoutError) as e:
+        pytest.skip(f"PostgreSQL is not available: {e}")
+
+    runner.run(admin.execute(f"DROP DATABASE IF EXISTS {PLAN_TEST_DB}"))
+    runner.run(admin.execute(f"CREATE DATABASE {PLAN_TEST_DB}"))
+    db = Database()
+    try:
+        runner.run(seed(db))
+        yield db
+    finally:
+        runner.run(db.close())
+        runner.run(admin.execute(f"DROP DATABASE IF EXISTS {PLAN_TEST_DB}"))
+        runner.run(admin.close())
+
+
+async def seed(db: Database) -> None:
+    """Create the schema and fill it with production-like volumes."""
+    db.pool = await asyncpg.create_pool(**connect_kwargs(PLAN_TEST_DB))
+    async with db.pool.acquire() as connection:
+        await apply_migrations(connection)
+        await connection.execute(SEED_SQL)
+    await db.reconcile_user_stats()
+    async with db.pool.acquire() as connection:
+        await connection.execute("ANALYZE")
+
+
+@pytest.mark.parametrize(
+    ("method", "args", "kwargs"),
+    HOT_QUERIES,
+    ids=[f"{method}-{i}" for i, (method, _, _) in enumerate(HOT_QUERIES)],
+)
+def test_hot_query_avoids_seq_scan(
+    runner: asyncio.Runner,
+    database: Database,
+    method: str,
+    args: tuple,
+    kwargs: dict,
+) -> None:
+    pool = database.pool
+    explain_pool = ExplainPool(pool)
+    user_scrans_cache.clear()
+    database.pool = explain_pool  # type: ignore[assignment]
+    try:
+        runner.run(getattr(database, method)(*args, **kwargs))
+    finally:
+        database.pool = pool
+
+    assert explain_pool.plans, f"{method} ran no queries"
+    for plan in explain_pool.plans:
+        scanned = set(find_seq_scans(plan)) & LARGE_TABLES
+        assert not scanned, f"{method} plans a sequential scan over {scanned}:\n{plan}"
+
+
+@pytest.mark.parametrize("generic", [False, True], ids=["custom", "generic"])
+@pytest.mark.parametrize(
+    ("kwargs", "cursor_cond"),
+    [({"before_id": 50000}, "(id < "), ({"after_id": 50000}, "(id > ")],
+    ids=["older", "newer"],
+)
+def test_user_scrans_cursor_is_index_condition(
+    runner: asyncio.Runner,
+    database: Database,
+    kwargs: dict,
+    cursor_cond: str,
+    generic: bool,
+) -> None:
+    # A cursor only filtering the index scan would read all newer rows of the user
+    pool = database.pool
+    explain_pool = ExplainPool(pool, generic)
+    user_scrans_cache.clear()
+    database.pool = explain_pool  # type: ignore[assignment]
+    try:
+        runner.run(database.get_user_scrans("42", **kwargs))
+    finally:
+        database.pool = pool
+
+    conds = [
+        cond
+        for plan in explain_pool.plans
+        for cond in find_index_conds(plan, "scrans_telegram_id_id_idx")
+    ]
+    assert any(cursor_cond in cond for cond in conds), f"Cursor is not an index condition: {conds}"
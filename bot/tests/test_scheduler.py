@@ -0,0 +1,72 @@
+"""Tests of daily round pairing."""
+
+import random
+
+import pytest
+
+from scheduler import ROUNDS_COUNT, build_daily_pairs, get_likes_percentage
+
+
+def make_scran(scran_id: int, likes: int, dislikes: int) -> dict:
+    return {"id": scran_id, "number_of_likes": likes, "number_of_dislikes": dislikes}
+
+
+@pytest.fixture(autouse=True)
+def seed() -> None:
+    random.seed(1234)
+
+
+def test_pairs_are_neighbours_in_the_whole_pool() -> None:
+    # Likes percentages 0, 0.25, 0.5, ... 99.75: neighbours differ by 0.25 points
+    candidates = [make_scran(i, i, 400 - i) for i in range(400)]
+    random.shuffle(candidates)
+    by_id = {scran["id"]: scran for scran in candidates}
+
+    for _ in range(50):
+        pairs = build_daily_pairs(candidates)
+        assert len(pairs) == ROUNDS_COUNT
+        for scran_a_id, scran_b_id in pairs:
+            gap = get_likes_percentage(by_id[scran_a_id]) - get_likes_percentage(by_id[scran_b_id])
+            assert abs(gap) == pytest.approx(0.25)
+
+
+def test_used_ids_are_excluded() -> None:
+    candidates = [make_scran(i, i % 50, 50 - i % 50) for i in range(100)]
+    exclude_ids = set(range(0, 100, 3))
+
+    for _ in range(50):
+        pairs = build_daily_pairs(candidates, exclude_ids)
+        ids = [scran_id for pair in pairs for scran_id in pair]
+        assert len(ids) == ROUNDS_COUNT * 2
+        assert len(set(ids)) == len(ids)
+        assert not set(ids) & exclude_ids
+
+
+def test_small_pool_uses_every_scran_once() -> None:
+    candidates = [make_scran(i, i, 20 - i) for i in range(ROUNDS_COUNT * 2)]
+
+    for _ in range(50):
+        ids = [scran_id for pair in build_daily_pairs(candidates) for scran_id in pair]
+        assert sorted(ids) == list(range(ROUNDS_COUNT * 2))
+
+
+def test_too_few_candidates_after_exclusion() -> None:
+    candidates = [make_scran(i, 1, 3) for i in range(ROUNDS_COUNT * 2)]
+
+    assert build_daily_pairs(candidates, {0}) == []
+
+
+def test_less_voted_neighbours_are_preferred() -> None:
+    # Same likes percentage, half of the scrans with 4 votes and half with 400
+    uncertain = [make_scran(i, 2, 2) for i in range(100)]
+    confident = [make_scran(i, 200, 200) for i in range(100, 200)]
+    uncertain_ids = {scran["id"] for scran in uncertain}
+
+    picked = [
+        scran_id
+        for _ in range(50)
+        for pair in build_daily_pairs(uncertain + confident)
+        for scran_id in pair
+    ]
+    share = sum(scran_id in uncertain_ids for scran_id in picked) / len(picked)
+    assert share > 0.75
@@ -0,0 +1,106 @@
+"""Tests of update ordering in shard workers and of worker restarts."""
+
+import asyncio
+import logging
+import os
+import queue
+import signal
+import time
+from typing import Any
+
+import pytest
+
+from sharding import ShardPool, mp_context, serve_shard
+
+
+def echo_worker(index: int, updates: Any, results: Any) -> None:
+    """Worker entry point sending every received update back."""
+    while (item := updates.get()) is not None:
+        results.put(item)
+
+
+def test_serve_shard_keeps_order_per_key() -> None:
+    updates: queue.Queue = queue.Queue()
+    handled: list[tuple[int, int]] = []
+
+    async def handle(data: dict) -> None:
+        # Earlier updates take longer, so any reordering would show
+        await asyncio.sleep((10 - data["seq"]) * 0.002)
+        handled.append((data["key"], data["seq"]))
+
+    for seq in range(10):
+        for key in (1, 2, 3):
+            updates.put((key, {"key": key, "seq": seq}))
+    updates.put(None)
+
+    asyncio.run(serve_shard(updates, handle, concurrency=8))
+
+    assert len(handled) == 30
+    for key in (1, 2, 3):
+        assert [seq for k, seq in handled if k == key] == list(range(10))
+
+
+def test_serve_shard_runs_keys_concurrently() -> None:
+    updates: queue.Queue = queue.Queue()
+    in_flight = 0
+    max_in_flight = 0
+
+    async def handle(data: dict) -> None:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+
+    for key in range(4):
+        updates.put((key, {"update_id": key}))
+    updates.put(None)
+
+    asyncio.run(serve_shard(updates, handle, concurrency=2))
+
+    assert max_in_flight == 2
+
+
+def test_restarted_worker_receives_updates() -> None:
+    results = mp_context.Queue()
+    pool = ShardPool(echo_worker, workers=1, queue_size=10, args=(results,))
+
+    async def scenario() -> None:
+        pool.start()
+        supervisor = asyncio.create_task(pool.supervise(interval=0.1))
+        try:
+            await pool.dispatch(1, {"update_id": 1})
+            assert results.get(timeout=30) == (1, {"update_id": 1})
+
+            # Kill the worker while it waits in queue.get() holding the read lock
+            dead = pool.processes[0]
+            assert dead is not None
+            time.sleep(0.2)
+            os.kill(dead.pid, signal.SIGKILL)  # type: ignore[arg-type]
+            while pool.processes[0] is dead:
+                await asyncio.sleep(0.05)
+
+            await pool.dispatch(1, {"update_id": 2})
+            assert results.get(timeout=30) == (1, {"update_id": 2})
+        finally:
+            supervisor.cancel()
+            await pool.stop(timeout=10)
+
+    asyncio.run(scenario())
+
+
+def test_restart_logs_lost_updates(caplog: pytest.LogCaptureFixture) -> None:
+    results = mp_context.Queue()
+    pool = ShardPool(echo_worker, workers=1, queue_size=10, args=(results,))
+
+    # Nothing reads the queue before the restart
+    for update_id in range(3):
+        pool.queues[0].put((1, {"update_id": update_id}))
+    time.sleep(0.2)
+
+    with caplog.at_level(logging.WARNING, logger="sharding"):
+        pool.restart(0)
+    try:
+        assert "lost 3 queued updates" in caplog.text
+    finally:
+        asyncio.run(pool.stop(timeout=10))
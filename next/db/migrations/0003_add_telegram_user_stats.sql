@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS "telegram_user_stats" (
+	"telegram_id" text PRIMARY KEY NOT NULL,
+	"votes_count" integer NOT NULL DEFAULT 0,
+	"likes_count" integer NOT NULL DEFAULT 0,
+	"suggested_count" integer NOT NULL DEFAULT 0,
+	"approved_count" integer NOT NULL DEFAULT 0,
+	"updated_at" timestamp NOT NULL DEFAULT now()
+);
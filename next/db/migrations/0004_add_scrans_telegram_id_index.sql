@@ -0,0 +1 @@
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "scrans_telegram_id_id_idx" ON "scrans" ("telegram_id", "id" DESC);
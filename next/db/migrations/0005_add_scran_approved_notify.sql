@@ -0,0 +1,14 @@
+CREATE OR REPLACE FUNCTION notify_scran_approved() RETURNS trigger AS $$
+BEGIN
+	PERFORM pg_notify('scran_approved', NEW.id::text);
+	RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "scran_approved_notify" ON "scrans";
+
+CREATE TRIGGER "scran_approved_notify"
+	AFTER UPDATE OF "approved" ON "scrans"
+	FOR EACH ROW
+	WHEN (NEW."approved" AND NOT OLD."approved")
+	EXECUTE FUNCTION notify_scran_approved();
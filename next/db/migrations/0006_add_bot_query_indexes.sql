@@ -0,0 +1,4 @@
+-- Run outside a transaction: CREATE INDEX CONCURRENTLY does not block writes.
+-- Partial index for approved scrans filtered or ordered by total votes
+-- (get_least_voted_scrans, get_daily_candidates, get_top_scrans).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "scrans_approved_total_votes_idx" ON "scrans" (("number_of_likes" + "number_of_dislikes")) WHERE "approved";
@@ -0,0 +1,19 @@
+CREATE OR REPLACE FUNCTION update_user_stats_approved_count() RETURNS trigger AS $$
+BEGIN
+	INSERT INTO "telegram_user_stats" ("telegram_id", "approved_count", "updated_at")
+	VALUES (NEW."telegram_id", CASE WHEN NEW."approved" THEN 1 ELSE 0 END, NOW())
+	ON CONFLICT ("telegram_id") DO UPDATE
+	SET "approved_count" = "telegram_user_stats"."approved_count"
+			+ CASE WHEN NEW."approved" THEN 1 ELSE -1 END,
+		"updated_at" = NOW();
+	RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS "scran_approved_user_stats" ON "scrans";
+
+CREATE TRIGGER "scran_approved_user_stats"
+	AFTER UPDATE OF "approved" ON "scrans"
+	FOR EACH ROW
+	WHEN (NEW."approved" IS DISTINCT FROM OLD."approved" AND NEW."telegram_id" IS NOT NULL)
+	EXECUTE FUNCTION update_user_stats_approved_count();
@@ -1,6 +1,7 @@
+import { sql } from "drizzle-orm";
 import { drizzle } from "drizzle-orm/node-postgres";
 import { Client } from "pg";
-import { pgTable, text, integer, real, boolean, timestamp, uniqueIndex } from "drizzle-orm/pg-core";
+import { pgTable, text, integer, real, boolean, timestamp, index, uniqueIndex } from "drizzle-orm/pg-core";
 
 // Для локальной разработки используем переменные окружения или значения по умолчанию
 const client = new Client({
@@ -35,7 +36,13 @@ export const scrans = pgTable("scrans", {
   numberOfDislikes: integer("number_of_dislikes").notNull().default(0),
   approved: boolean("approved").notNull().default(false),
   telegramId: text("telegram_id"),
-});
+}, (table) => ({
+  telegramIdIdx: index("scrans_telegram_id_id_idx").concurrently().on(table.telegramId, table.id.desc()),
+  approvedTotalVotesIdx: index("scrans_approved_total_votes_idx")
+    .concurrently()
+    .on(sql`(${table.numberOfLikes} + ${table.numberOfDislikes})`)
+    .where(sql`${table.approved}`),
+}));
 
 export const dailyScrandles = pgTable("daily_scrandles", {
   id: integer("id").primaryKey().generatedAlwaysAsIdentity(),
@@ -80,8 +87,18 @@ export const telegramVotes = pgTable("telegram_votes", {
   uniqueVote: uniqueIndex("unique_telegram_vote").on(table.telegramId, table.scranId),
 }));
 
+export const telegramUserStats = pgTable("telegram_user_stats", {
+  telegramId: text("telegram_id").primaryKey(),
+  votesCount: integer("votes_count").notNull().default(0),
+  likesCount: integer("likes_count").notNull().default(0),
+  suggestedCount: integer("suggested_count").notNull().default(0),
+  approvedCount: integer("approved_count").notNull().default(0),
+  updatedAt: timestamp("updated_at").notNull().defaultNow(),
+});
+
 export type Scran = typeof scrans.$inferSelect;
 export type DailyScrandle = typeof dailyScrandles.$inferSelect;
 export type ScrandleVote = typeof scrandleVotes.$inferSelect;
 export type DailyUserResult = typeof dailyUserResults.$inferSelect;
 export type TelegramVote = typeof telegramVotes.$inferSelect;
+export type TelegramUserStats = typeof telegramUserStats.$inferSelect;